@@ -1,3 +1,5 @@
+from compressed_input import open_text
+
 def infer_type(value):
     value = value.strip()
     if value == "":
@@ -14,7 +16,7 @@ def infer_type(value):
 
 def main():
     filename = "imdb-movies-dataset.csv"
-    with open(filename, "r", encoding="utf-8") as f:
+    with open_text(filename, encoding="utf-8") as f:
         header = f.readline().strip().split(",")
         first_row = f.readline().strip().split(",")
     types = []
@@ -11,6 +11,8 @@ fields and doubled quotes per CSV rules.
 
 import sys
 
+from compressed_input import open_text
+
 
 def parse_csv_records(content):
     """Parse the full CSV content and return a list of records (each a list of fields).
@@ -73,7 +75,7 @@ def main():
     csv_path = 'imdb-movies-dataset.csv'
 
     try:
-        f = open(csv_path, 'r', encoding='utf-8')
+        f = open_text(csv_path, encoding='utf-8')
     except Exception as e:
         sys.stderr.write('Error opening %s: %s\n' % (csv_path, e))
         return
@@ -1,4 +1,6 @@
 # ...existing code...
+from compressed_input import open_text
+
 class Movie:
     """
     Simple Movie data container.
@@ -66,7 +68,7 @@ def load_movies_from_csv(path):
     Reads CSV at path and returns list of Movie objects.
     Does not use any external modules.
     """
-    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+    with open_text(path, encoding='utf-8', errors='replace') as f:
         text = f.read()
     rows = _parse_csv_text(text)
     if not rows:
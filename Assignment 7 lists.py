@@ -1,3 +1,5 @@
+from compressed_input import open_text
+
 def parse_csv_line(line):
     # simple CSV parser handling quoted fields and doubled quotes
     fields = []
@@ -26,7 +28,7 @@ def export_titles_by_genre(csv_path):
     user_genre = input("Enter genre (e.g. Action): ").strip().lower()
     results = {}
 
-    with open(csv_path, 'r', encoding='utf-8') as f:
+    with open_text(csv_path, encoding='utf-8') as f:
         header = f.readline()
         if not header:
             print("Empty file.")
@@ -98,7 +100,7 @@ def export_titles_by_genre(csv_path):
     user_genre = input("Enter genre (e.g. Action): ").strip().lower()
     results = {}
 
-    with open(csv_path, 'r', encoding='utf-8') as f:
+    with open_text(csv_path, encoding='utf-8') as f:
         header = f.readline()
         if not header:
             print("Empty file.")
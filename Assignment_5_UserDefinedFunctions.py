@@ -1,3 +1,5 @@
+from compressed_input import open_text
+
 def average_rating_for_certificate(csv_path, certificate, encoding='utf-8', round_digits=None):
     """
     Calculate the average 'Rating' for rows whose 'Certificate' equals the given certificate.
@@ -11,7 +13,7 @@ def average_rating_for_certificate(csv_path, certificate, encoding='utf-8', roun
     - None if no matching rows or if file contains no usable ratings
     """
     # Read entire file (keeps parser simple and allows newlines inside quoted fields)
-    with open(csv_path, 'r', encoding=encoding, errors='replace') as f:
+    with open_text(csv_path, encoding=encoding, errors='replace') as f:
         text = f.read()
 
     rows = []
@@ -1,4 +1,6 @@
 # ...existing code...
+from compressed_input import open_text
+
 def parse_csv_line(line):
     """Minimal CSV line parser handling quoted fields."""
     fields = []
@@ -62,7 +64,7 @@ def most_common_words_by_certificate(csv_path, top_n=10, min_word_len=2):
     """
     counts_by_cert = {}
     try:
-        f = open(csv_path, 'r', encoding='utf-8', errors='replace')
+        f = open_text(csv_path, encoding='utf-8', errors='replace')
     except Exception as e:
         raise RuntimeError("Could not open file: " + str(e))
     with f:
@@ -12,6 +12,8 @@ It assumes newlines do not appear inside quoted fields (which matches the provid
 
 from typing import List
 
+from compressed_input import open_text
+
 
 def parse_csv_text(text: str) -> List[List[str]]:
     """Parse CSV text into rows of fields using only builtins.
@@ -110,7 +112,7 @@ def read_and_sort_by_director(path: str) -> List[List[str]]:
     Returns the header row followed by data rows sorted by the Director column.
     If the Director column is missing, returns rows unsorted.
     """
-    with open(path, 'r', encoding='utf-8') as f:
+    with open_text(path, encoding='utf-8') as f:
         text = f.read()
 
     rows = parse_csv_text(text)
@@ -0,0 +1,425 @@
+"""
+Dictionary-encoded (categorical) columns for the IMDB movies dataset.
+
+Certificate, Director, Year and the Genre tokens repeat heavily, but the
+row-oriented loaders keep a separate str for every occurrence. Here each of
+those columns is stored as small integer codes (array('H'), widened to
+array('I') if a column ever has more than 65535 distinct values) plus one
+shared dictionary of values, so every distinct string exists only once.
+
+Group-bys (certificate averages, genre counts, per-certificate word buckets)
+index plain lists by code, and the .strip().lower() normalization is done
+once per dictionary entry instead of once per row.
+
+Certificates that differ only in case or surrounding whitespace ('R', ' r ')
+are one group everywhere: category_key() is the grouping rule, and a group
+is shown under the first spelling in file order. The streaming versions of
+these group-bys (spilling_operators, pipeline, group_topk) use the same rule
+through CategoryGroups, and rank words with the same top_words() order:
+count descending, ties in the order the words were first seen (like the
+stable sort in Assignment 9).
+
+Functions:
+ - category_key(value): the key values are grouped by
+ - CategoryGroups: the same grouping for rows seen one at a time
+ - top_words(counts, top_n): the word ranking shared by the word counts
+ - load_columnar(path): read the CSV into a MovieTable.
+ - average_rating_by_certificate(table) / average_rating_for_certificate(table, cert)
+ - genre_counts(table)
+ - most_common_words_by_certificate(table, top_n, min_word_len)
+"""
+
+import heapq
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from compressed_input import open_text
+from csv_records import find_column, iter_records, parse_number
+
+STOPWORDS = frozenset({
+    'the', 'and', 'a', 'an', 'is', 'it', 'to', 'of', 'in', 'that', 'this', 'with', 'for',
+    'on', 'as', 'are', 'was', 'but', 'be', 'by', 'not', 'or', 'from', 'at', 'its', 'has',
+    'have', 'they', 'their', 'i', 'you', 'he', 'she', 'we', 'his', 'her', 'them', 'who'
+})
+
+# array('H') holds codes 0..65535
+_SMALL_CODE_LIMIT = 1 << 16
+
+
+def category_key(value: str) -> str:
+    """Group key of a categorical value: spellings differing only in case/whitespace share it."""
+    return value.strip().lower()
+
+
+class CategoryGroups:
+    """Streaming version of CategoricalColumn.groups(): group key -> display name.
+
+    add() is given each value with its position in the file (a row number,
+    or (batch seq, row) in the pipeline). A group is shown under the
+    spelling at the earliest position, so instances filled by parallel
+    workers merge to the same names in any order.
+    """
+
+    def __init__(self):
+        self.first: Dict[str, Tuple[Any, str]] = {}
+
+    def add(self, value: str, where: Any) -> str:
+        """Return the group key of value (already stripped)."""
+        key = category_key(value)
+        old = self.first.get(key)
+        if old is None or where < old[0]:
+            self.first[key] = (where, value)
+        return key
+
+    def merge(self, other: 'CategoryGroups') -> None:
+        for key, (where, value) in other.first.items():
+            old = self.first.get(key)
+            if old is None or where < old[0]:
+                self.first[key] = (where, value)
+
+    def name(self, key: str) -> str:
+        return self.first[key][1]
+
+    def keys(self) -> List[str]:
+        """Group keys in order of first appearance."""
+        return sorted(self.first, key=lambda k: self.first[k][0])
+
+
+def top_words(counts: Iterable[Tuple[str, int, Any]], top_n: int) -> List[Tuple[str, int]]:
+    """(word, count, first position) triples -> top_n (word, count).
+
+    Highest count first; equal counts keep first-seen order.
+    """
+    best = heapq.nsmallest(top_n, counts, key=lambda x: (-x[1], x[2]))
+    return [(w, c) for w, c, _ in best]
+
+
+class CategoricalColumn:
+    """One value per row, stored as an integer code into a shared dictionary."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.codes = array('H')
+        self.values: List[str] = []
+        self._lookup: Dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        """Return the code for value, adding it to the dictionary if new."""
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            if code == _SMALL_CODE_LIMIT and self.codes.typecode == 'H':
+                # too many distinct values for 16-bit codes
+                self.codes = array('I', self.codes)
+            self.values.append(value)
+            self._lookup[value] = code
+        return code
+
+    def append(self, value: str) -> None:
+        self.codes.append(self.encode(value))
+
+    def codes_matching(self, value: str) -> Set[int]:
+        """Codes whose value equals `value` ignoring case and surrounding whitespace."""
+        target = category_key(value)
+        return {code for code, v in enumerate(self.values) if category_key(v) == target}
+
+    def groups(self) -> Tuple[List[int], List[str]]:
+        """Collapse values that differ only in case/surrounding whitespace.
+
+        Returns (group_of, names): group_of[code] is the group of a code and
+        names[group] the first spelling seen (stripped).
+        """
+        group_of: List[int] = []
+        names: List[str] = []
+        group_ids: Dict[str, int] = {}
+        for value in self.values:
+            key = category_key(value)
+            if key not in group_ids:
+                group_ids[key] = len(names)
+                names.append(value.strip())
+            group_of.append(group_ids[key])
+        return group_of, names
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, row: int) -> str:
+        return self.values[self.codes[row]]
+
+
+class MultiCategoricalColumn:
+    """Several tokens per row (e.g. "Action, Drama"), stored as a flat code array.
+
+    The tokens of row i are codes[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, name: str, sep: str = ','):
+        self.name = name
+        self.sep = sep
+        self.tokens = CategoricalColumn(name)
+        self.offsets = array('I', [0])
+
+    @property
+    def codes(self) -> array:
+        return self.tokens.codes
+
+    @property
+    def values(self) -> List[str]:
+        return self.tokens.values
+
+    def append(self, field: str) -> None:
+        for token in field.split(self.sep):
+            token = token.strip()
+            if token:
+                self.tokens.append(token)
+        self.offsets.append(len(self.tokens.codes))
+
+    def row_codes(self, row: int) -> array:
+        return self.tokens.codes[self.offsets[row]:self.offsets[row + 1]]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> List[str]:
+        values = self.tokens.values
+        return [values[c] for c in self.row_codes(row)]
+
+
+class MovieTable:
+    """Column-oriented movie table.
+
+    categorical -> CategoricalColumn, multi-valued -> MultiCategoricalColumn,
+    numeric -> array('d') (NaN for missing), anything else -> list of str.
+    """
+
+    def __init__(self, header: List[str], columns: Dict[str, object], n_rows: int):
+        self.header = header
+        self.columns = columns
+        self.n_rows = n_rows
+
+    def column(self, name: str):
+        """Look up a column by header name (case/whitespace-insensitive)."""
+        idx = find_column(self.header, name)
+        if idx is None:
+            return None
+        return self.columns.get(self.header[idx])
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+
+def load_columnar(path: str,
+                  categorical: Iterable[str] = ('Certificate', 'Director', 'Year'),
+                  multi_valued: Iterable[str] = ('Genre',),
+                  numeric: Iterable[str] = ('Rating', 'Duration (min)', 'Metascore', 'Votes'),
+                  keep: Optional[Iterable[str]] = None,
+                  encoding: str = 'utf-8') -> MovieTable:
+    """Read the CSV at path into a MovieTable.
+
+    keep: if given, only these columns (plus the encoded/numeric ones) are
+    loaded; long text columns can be dropped this way to save memory.
+    """
+    with open_text(path, encoding=encoding, errors='replace') as f:
+        return build_table(iter_records(f), categorical, multi_valued, numeric, keep)
+
+
+def build_table(records: Iterable[List[str]],
+                categorical: Iterable[str] = ('Certificate', 'Director', 'Year'),
+                multi_valued: Iterable[str] = ('Genre',),
+                numeric: Iterable[str] = ('Rating', 'Duration (min)', 'Metascore', 'Votes'),
+                keep: Optional[Iterable[str]] = None) -> MovieTable:
+    """Build a MovieTable from parsed records; the first record is the header."""
+    records = iter(records)
+    header = next(records, None)
+    if header is None:
+        return MovieTable([], {}, 0)
+    header = [h.strip() for h in header]
+
+    def indices(names: Iterable[str]) -> List[int]:
+        found = []
+        for name in names:
+            idx = find_column(header, name)
+            if idx is not None:
+                found.append(idx)
+        return found
+
+    cat_idx = indices(categorical)
+    multi_idx = indices(multi_valued)
+    num_idx = indices(numeric)
+    encoded = set(cat_idx) | set(multi_idx) | set(num_idx)
+    if keep is None:
+        text_idx = [i for i in range(len(header)) if i not in encoded]
+    else:
+        text_idx = [i for i in indices(keep) if i not in encoded]
+
+    columns: Dict[str, object] = {}
+    cat_cols = [(i, CategoricalColumn(header[i])) for i in cat_idx]
+    multi_cols = [(i, MultiCategoricalColumn(header[i])) for i in multi_idx]
+    num_cols = [(i, array('d')) for i in num_idx]
+    text_cols: List[Tuple[int, List[str]]] = [(i, []) for i in text_idx]
+    for i, col in cat_cols + multi_cols:
+        columns[header[i]] = col
+    for i, col in num_cols + text_cols:
+        columns[header[i]] = col
+
+    nan = float('nan')
+    width = len(header)
+    n_rows = 0
+    for r in records:
+        if len(r) < width:
+            # align row length with header (missing -> empty string)
+            r = r + [''] * (width - len(r))
+        for i, col in cat_cols:
+            col.append(r[i].strip())
+        for i, col in multi_cols:
+            col.append(r[i])
+        for i, col in num_cols:
+            val = parse_number(r[i])
+            col.append(nan if val is None else val)
+        for i, col in text_cols:
+            col.append(r[i])
+        n_rows += 1
+    return MovieTable(header, columns, n_rows)
+
+
+def average_rating_by_certificate(table: MovieTable, round_digits: Optional[int] = None) -> Dict[str, float]:
+    """Average Rating per certificate (empty certificates are skipped).
+
+    Certificates that differ only in case/whitespace are grouped together.
+    """
+    certs = table.column('Certificate')
+    ratings = table.column('Rating')
+    if certs is None or ratings is None:
+        return {}
+
+    # collapse dictionary entries that normalize to the same certificate
+    group_of, names = certs.groups()
+
+    totals = [0.0] * len(names)
+    counts = [0] * len(names)
+    for code, rating in zip(certs.codes, ratings):
+        if rating != rating:  # NaN -> missing rating
+            continue
+        g = group_of[code]
+        totals[g] += rating
+        counts[g] += 1
+
+    result = {}
+    for g, name in enumerate(names):
+        if not name or counts[g] == 0:
+            continue
+        avg = totals[g] / counts[g]
+        if round_digits is not None:
+            avg = round(avg, int(round_digits))
+        result[name] = avg
+    return result
+
+
+def average_rating_for_certificate(table: MovieTable, certificate: str,
+                                   round_digits: Optional[int] = None) -> Optional[float]:
+    """Same result as Assignment 5's average_rating_for_certificate, on a loaded table."""
+    certs = table.column('Certificate')
+    ratings = table.column('Rating')
+    if certs is None or ratings is None:
+        return None
+    wanted = certs.codes_matching(certificate)
+    if not wanted:
+        return None
+
+    total = 0.0
+    count = 0
+    for code, rating in zip(certs.codes, ratings):
+        if code in wanted and rating == rating:
+            total += rating
+            count += 1
+    if count == 0:
+        return None
+    avg = total / count
+    if round_digits is not None:
+        avg = round(avg, int(round_digits))
+    return avg
+
+
+def genre_counts(table: MovieTable) -> Dict[str, int]:
+    """Number of movies per genre; a movie with several genres counts once for each."""
+    genres = table.column('Genre')
+    if genres is None:
+        return {}
+    counts = [0] * len(genres.values)
+    for code in genres.codes:
+        counts[code] += 1
+    return {genre: counts[code] for code, genre in enumerate(genres.values)}
+
+
+def tokenize(text: str, min_len: int = 2, stopwords=STOPWORDS) -> List[str]:
+    """Lower-case alphabetic words of at least min_len characters, minus stopwords."""
+    text = text.lower()
+    words = []
+    cur = []
+    for ch in text:
+        if ch.isalpha():
+            cur.append(ch)
+        else:
+            if cur:
+                w = ''.join(cur)
+                if len(w) >= min_len and w not in stopwords:
+                    words.append(w)
+                cur = []
+    if cur:
+        w = ''.join(cur)
+        if len(w) >= min_len and w not in stopwords:
+            words.append(w)
+    return words
+
+
+def most_common_words_by_certificate(table: MovieTable, top_n: int = 10,
+                                     min_word_len: int = 2) -> Dict[str, List[Tuple[str, int]]]:
+    """certificate -> list of (word, count) sorted by count desc, like Assignment 9.
+
+    Certificates are grouped as in average_rating_by_certificate.
+    """
+    certs = table.column('Certificate')
+    reviews = table.column('Review')
+    if certs is None or reviews is None:
+        return {}
+
+    # one word bucket per certificate group
+    group_of, names = certs.groups()
+    buckets: List[Optional[Dict[str, int]]] = [None] * len(names)
+    for code, review in zip(certs.codes, reviews):
+        g = group_of[code]
+        if not names[g]:
+            continue
+        words = tokenize(review, min_word_len)
+        if not words:
+            continue
+        bucket = buckets[g]
+        if bucket is None:
+            bucket = buckets[g] = {}
+        for w in words:
+            bucket[w] = bucket.get(w, 0) + 1
+
+    result = {}
+    for g, bucket in enumerate(buckets):
+        if bucket is None:
+            continue
+        # dict order is first-seen order
+        result[names[g]] = top_words(((w, c, i) for i, (w, c) in enumerate(bucket.items())), top_n)
+    return result
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        print('Usage: python categorical_columns.py <path-to-csv>')
+        sys.exit(1)
+
+    table = load_columnar(sys.argv[1])
+    print(f'Loaded {len(table)} movies')
+    for name in ('Certificate', 'Director', 'Year', 'Genre'):
+        col = table.column(name)
+        if col is not None:
+            print(f'{name}: {len(col.values)} distinct values, codes typecode {col.codes.typecode!r}')
+    print('Average rating by certificate:', average_rating_by_certificate(table, round_digits=3))
+    print('Genre counts:', genre_counts(table))
@@ -0,0 +1,357 @@
+"""
+Open the IMDB CSV whether it is plain text or an archived .gz/.bz2/.xz export.
+
+The compression is detected from the file's magic bytes (not its name) and
+the data is decompressed as a stream with the stdlib gzip/bz2/lzma modules,
+so the whole file is never held in memory. Decompression runs on a
+background thread and hands chunks to the reader through a bounded queue;
+zlib, bz2 and lzma release the GIL while they work, so decoding overlaps
+with parsing.
+
+A gzip file made of several members (e.g. exports concatenated with cat,
+or written by pigz/bgzip) can also be decoded by a pool of worker
+processes, one member per task, with the output kept in file order. The
+pool is only used once a second member start has been checked, and a
+worker returns at most MAX_MEMBER_TASK bytes: a larger member is streamed
+by the reader instead, so memory stays bounded.
+
+Functions:
+ - detect_compression(path): 'gzip', 'bz2', 'xz' or None
+ - source_fingerprint(path): changes whenever the file is rewritten
+ - open_binary(path, workers=1): binary stream of the decompressed data
+ - open_text(path, encoding, errors, newline, workers=1): text stream, drop-in for open(path, 'r')
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+)
+_OPENERS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+# gzip member header: magic + deflate compression method
+_GZIP_MEMBER_START = b'\x1f\x8b\x08'
+
+CHUNK_SIZE = 256 * 1024
+QUEUE_CHUNKS = 16
+# bytes hashed at each end of the file on top of size/mtime
+_FINGERPRINT_SAMPLE = 64 * 1024
+# decoded bytes a worker may send back for one member
+MAX_MEMBER_TASK = 32 * 1024 * 1024
+_PROBE_SIZE = 16 * 1024
+
+
+def source_fingerprint(path: str) -> str:
+    """Identify the current contents of path (size, mtime and a CRC of both ends)."""
+    st = os.stat(path)
+    crc = 0
+    with open(path, 'rb') as f:
+        crc = zlib.crc32(f.read(_FINGERPRINT_SAMPLE), crc)
+        if st.st_size > _FINGERPRINT_SAMPLE:
+            f.seek(max(_FINGERPRINT_SAMPLE, st.st_size - _FINGERPRINT_SAMPLE))
+            crc = zlib.crc32(f.read(), crc)
+    return f'{st.st_size:x}-{st.st_mtime_ns:x}-{crc:08x}'
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """Return 'gzip', 'bz2' or 'xz' based on the file's first bytes, else None."""
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, name in MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+class _ChunkStream(io.RawIOBase):
+    """Read-only raw stream over an iterator of bytes chunks."""
+
+    def __init__(self, chunks: Iterator[bytes], on_close=None):
+        self._chunks = chunks
+        self._buf = b''
+        self._pos = 0
+        self._on_close = on_close
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while self._pos >= len(self._buf):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buf = chunk
+            self._pos = 0
+        n = min(len(b), len(self._buf) - self._pos)
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self) -> None:
+        if not self.closed and self._on_close is not None:
+            self._on_close()
+        super().close()
+
+
+class _BackgroundReader:
+    """Pulls chunks from an iterator on a daemon thread into a bounded queue."""
+
+    _DONE = object()
+
+    def __init__(self, chunks: Iterator[bytes], maxsize: int = QUEUE_CHUNKS):
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, args=(chunks,), daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, chunks: Iterator[bytes]) -> None:
+        try:
+            for chunk in chunks:
+                if not self._put(chunk):
+                    return
+        except BaseException as e:  # re-raised in the consumer thread
+            self._error = e
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+            self._put(self._DONE)
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield item
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def _stream_chunks(path: str, kind: str) -> Iterator[bytes]:
+    with _OPENERS[kind](path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def gzip_member_candidates(path: str) -> List[int]:
+    """Offsets where a gzip member header appears.
+
+    Every real member start is in the list; some entries may be false
+    positives inside compressed data, which _decode_member rejects.
+    """
+    offsets = []
+    overlap = len(_GZIP_MEMBER_START) - 1
+    base = 0
+    tail = b''
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(4 * 1024 * 1024)
+            if not block:
+                break
+            data = tail + block
+            start = 0
+            while True:
+                i = data.find(_GZIP_MEMBER_START, start)
+                if i < 0:
+                    break
+                offsets.append(base - len(tail) + i)
+                start = i + 1
+            tail = data[-overlap:]
+            base += len(block)
+    return offsets
+
+
+def _is_member_start(f, offset: int) -> bool:
+    """Check that a gzip member plausibly starts at offset.
+
+    The header flags and extra-flags bytes must be valid and the start of
+    the member must inflate without error. The magic bytes alone also turn
+    up by chance inside compressed data.
+    """
+    f.seek(offset)
+    head = f.read(_PROBE_SIZE)
+    if len(head) < 10 or head[3] & 0xe0 or head[8] not in (0, 2, 4):
+        return False
+    try:
+        zlib.decompressobj(wbits=31).decompress(head, _PROBE_SIZE)
+    except zlib.error:
+        return False
+    return True
+
+
+def _has_several_members(path: str, candidates: List[int]) -> bool:
+    """True if a candidate after the first one is a real member start."""
+    with open(path, 'rb') as f:
+        return any(_is_member_start(f, offset) for offset in candidates[1:])
+
+
+def _inflate(d, block: bytes) -> Iterator[bytes]:
+    """Feed block to a decompressobj, yielding output at most CHUNK_SIZE bytes at a time."""
+    data = d.decompress(block, CHUNK_SIZE)
+    while True:
+        if data:
+            yield data
+        if d.eof or not d.unconsumed_tail:
+            return
+        data = d.decompress(d.unconsumed_tail, CHUNK_SIZE)
+
+
+def _decode_member(path: str, offset: int,
+                   limit: int = MAX_MEMBER_TASK) -> Tuple[int, Optional[bytes], Optional[int]]:
+    """Decode the single gzip member starting at offset (runs in a worker process).
+
+    Returns (offset, data, end_offset); data is None if offset is not a
+    valid member start. end_offset is None if the member decodes to more
+    than limit bytes; the caller streams such a member itself.
+    """
+    d = zlib.decompressobj(wbits=31)
+    out = []
+    size = 0
+    pos = offset
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while not d.eof:
+                block = f.read(CHUNK_SIZE)
+                if not block:
+                    return offset, None, pos  # truncated member
+                for data in _inflate(d, block):
+                    size += len(data)
+                    if size > limit:
+                        return offset, b'', None
+                    out.append(data)
+                pos += len(block)
+    except zlib.error:
+        return offset, None, pos
+    return offset, b''.join(out), pos - len(d.unused_data)
+
+
+def _stream_member(path: str, offset: int) -> Iterator[bytes]:
+    """Yield the decoded data of the gzip member at offset; returns its end offset."""
+    d = zlib.decompressobj(wbits=31)
+    pos = offset
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while not d.eof:
+            block = f.read(CHUNK_SIZE)
+            if not block:
+                raise OSError(f'{path}: truncated gzip member at offset {offset}')
+            pos += len(block)
+            yield from _inflate(d, block)
+    return pos - len(d.unused_data)
+
+
+def _parallel_gzip_chunks(path: str, candidates: List[int], workers: int) -> Iterator[bytes]:
+    """Decode gzip members in worker processes and yield their data in file order.
+
+    The pool is created and its first tasks submitted here, on the calling
+    thread, so the worker processes are started before the background
+    reader thread exists. The returned generator then collects the results.
+    """
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending: deque = deque()
+    todo = iter(candidates)
+    for offset in todo:
+        pending.append(pool.submit(_decode_member, path, offset))
+        if len(pending) >= 2 * workers:
+            break
+    return _collect_members(path, pool, pending, todo)
+
+
+def _collect_members(path: str, pool: ProcessPoolExecutor, pending: deque,
+                     todo: Iterator[int]) -> Iterator[bytes]:
+    expected = 0
+    try:
+        while pending:
+            start, data, end = pending.popleft().result()
+            nxt = next(todo, None)
+            if nxt is not None:
+                pending.append(pool.submit(_decode_member, path, nxt))
+            if start < expected:
+                continue  # false candidate inside an earlier member
+            if start > expected:
+                raise OSError(f'{path}: gzip data between offsets {expected} and {start} is not a valid member')
+            if data is None:
+                raise OSError(f'{path}: invalid gzip member at offset {start}')
+            if end is None:
+                # too large to send back from a worker: decode it here as a stream
+                expected = yield from _stream_member(path, start)
+                continue
+            expected = end
+            if data:
+                yield data
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def open_binary(path: str, workers: int = 1, background: bool = True) -> io.BufferedIOBase:
+    """Open path for binary reading, decompressing it if needed.
+
+    workers > 1 decodes multi-member gzip files in that many processes.
+    background=False decompresses on the calling thread instead.
+    """
+    kind = detect_compression(path)
+    if kind is None:
+        return open(path, 'rb')
+    candidates = gzip_member_candidates(path) if kind == 'gzip' and workers > 1 else []
+    if len(candidates) > 1 and _has_several_members(path, candidates):
+        chunks = _parallel_gzip_chunks(path, candidates, workers)
+    else:
+        chunks = _stream_chunks(path, kind)
+    if not background:
+        return io.BufferedReader(_ChunkStream(chunks), CHUNK_SIZE)
+    reader = _BackgroundReader(chunks)
+    return io.BufferedReader(_ChunkStream(iter(reader), on_close=reader.stop), CHUNK_SIZE)
+
+
+def open_text(path: str, encoding: str = 'utf-8', errors: str = 'strict',
+              newline: Optional[str] = None, workers: int = 1) -> io.TextIOBase:
+    """Drop-in replacement for open(path, 'r', ...) that also reads .gz/.bz2/.xz files."""
+    if detect_compression(path) is None:
+        return open(path, 'r', encoding=encoding, errors=errors, newline=newline)
+    return io.TextIOWrapper(open_binary(path, workers), encoding=encoding,
+                            errors=errors, newline=newline)
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        print('Usage: python compressed_input.py <path-to-csv[.gz|.bz2|.xz]> [workers]')
+        sys.exit(1)
+
+    n_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    kind = detect_compression(sys.argv[1])
+    print('Compression:', kind or 'none')
+    lines = 0
+    with open_text(sys.argv[1], errors='replace', workers=n_workers) as f:
+        for _ in f:
+            lines += 1
+    print(f'Read {lines} lines')
@@ -0,0 +1,113 @@
+"""
+Streaming CSV record reader for the IMDB movies dataset.
+Only Python built-ins are used (no csv module).
+
+Functions:
+ - split_record(text): split one complete CSV record into its fields.
+ - iter_records(f): yield records from an open text file one at a time.
+ - find_column(header, name): case/whitespace-insensitive header lookup.
+ - parse_number(text): parse a numeric cell such as "1,234,567".
+ - format_record(fields): format fields back into one CSV record.
+
+Unlike the line-based readers, iter_records joins physical lines until the
+quotes balance, so Review fields that contain newlines stay in one record.
+"""
+
+from typing import Iterable, Iterator, List, Optional
+
+
+def split_record(text: str) -> List[str]:
+    """Split one complete CSV record (no trailing newline) into fields.
+
+    Handles quoted fields with commas/newlines and "" as an escaped quote.
+    """
+    if '"' not in text:
+        # fast path: nothing quoted, a plain split is exact
+        return text.split(',')
+
+    fields: List[str] = []
+    cur: List[str] = []
+    in_quotes = False
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '"':
+            if in_quotes and i + 1 < n and text[i + 1] == '"':
+                # doubled quote -> literal quote
+                cur.append('"')
+                i += 2
+                continue
+            in_quotes = not in_quotes
+        elif ch == ',' and not in_quotes:
+            fields.append(''.join(cur))
+            cur = []
+        else:
+            cur.append(ch)
+        i += 1
+    fields.append(''.join(cur))
+    return fields
+
+
+def iter_records(f: Iterable[str]) -> Iterator[List[str]]:
+    """Yield records (lists of fields) from an iterable of text lines.
+
+    A record is complete once it contains an even number of double quotes;
+    until then the following physical lines are appended to it. Blank lines
+    are skipped. The first record yielded is the header.
+    """
+    parts: List[str] = []
+    quotes = 0
+    for line in f:
+        parts.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            # still inside a quoted field, keep collecting lines
+            continue
+        text = parts[0] if len(parts) == 1 else ''.join(parts)
+        parts = []
+        quotes = 0
+        text = text.rstrip('\r\n')
+        if not text.strip():
+            continue
+        yield split_record(text)
+
+    if parts:
+        # unterminated quote at EOF - still try to salvage the record
+        yield split_record(''.join(parts).rstrip('\r\n'))
+
+
+def find_column(header: List[str], name: str) -> Optional[int]:
+    """Return the index of column `name` in header, or None if it is missing.
+
+    Matching ignores case, surrounding quotes and repeated whitespace.
+    """
+    def norm(s: str) -> str:
+        return ' '.join(s.strip().strip('"').lower().split())
+
+    target = norm(name)
+    for idx, col in enumerate(header):
+        if norm(col) == target:
+            return idx
+    return None
+
+
+def parse_number(text: str) -> Optional[float]:
+    """Parse a numeric cell such as '8.1', '142' or '1,234,567' (None if empty/invalid)."""
+    text = text.strip().strip('"').replace(',', '')
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def format_record(fields: List[str]) -> str:
+    """Format fields as one CSV record (with trailing newline), quoting when needed."""
+    out = []
+    for field in fields:
+        if '"' in field or ',' in field or '\n' in field or '\r' in field:
+            field = '"' + field.replace('"', '""') + '"'
+        out.append(field)
+    return ','.join(out) + '\n'
@@ -0,0 +1,209 @@
+"""
+Per-director statistics table (a group-by-director materialized view).
+
+For every director the table holds the movie count, mean rating,
+vote-weighted rating, total votes, first/last year (career span) and the
+genre mix. It is built in one streaming pass over the CSV and saved next to
+it as <csv>.directors.json together with the file's size and mtime (as the
+.idx and .ranges sidecars are); later calls load the saved table instead of
+re-reading the CSV, and rebuild it only when the CSV has changed.
+
+Functions:
+ - build_director_stats(path): one pass over the CSV -> {director: DirectorStats}
+ - director_stats(path): load the saved table, or build and save it
+ - top_directors(stats, n, min_films, by, select_by): top-N query, e.g. the
+   20 most prolific directors with at least 5 films ranked by mean rating:
+   top_directors(stats, 20, 5, by='mean_rating', select_by='count')
+"""
+
+import heapq
+import json
+import os
+from typing import Dict, List, Optional
+
+from compressed_input import open_text
+from csv_records import find_column, iter_records, parse_number
+
+SIDECAR_SUFFIX = '.directors.json'
+RANKINGS = ('mean_rating', 'weighted_rating', 'count', 'total_votes', 'career_span')
+
+
+class DirectorStats:
+    """Running totals for one director."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.rating_sum = 0.0
+        self.rated = 0
+        # sum(rating * votes) and sum(votes) over movies that have both
+        self.weighted_sum = 0.0
+        self.weighted_votes = 0
+        self.total_votes = 0
+        self.first_year: Optional[int] = None
+        self.last_year: Optional[int] = None
+        self.genres: Dict[str, int] = {}
+
+    def add(self, rating: Optional[float], votes: Optional[float], year: Optional[float],
+            genres: List[str]) -> None:
+        self.count += 1
+        if rating is not None:
+            self.rating_sum += rating
+            self.rated += 1
+        if votes is not None:
+            votes = int(votes)
+            self.total_votes += votes
+            if rating is not None:
+                self.weighted_sum += rating * votes
+                self.weighted_votes += votes
+        if year is not None:
+            year = int(year)
+            if self.first_year is None or year < self.first_year:
+                self.first_year = year
+            if self.last_year is None or year > self.last_year:
+                self.last_year = year
+        for g in genres:
+            self.genres[g] = self.genres.get(g, 0) + 1
+
+    @property
+    def mean_rating(self) -> Optional[float]:
+        return self.rating_sum / self.rated if self.rated else None
+
+    @property
+    def weighted_rating(self) -> Optional[float]:
+        return self.weighted_sum / self.weighted_votes if self.weighted_votes else None
+
+    @property
+    def career_span(self) -> Optional[int]:
+        if self.first_year is None:
+            return None
+        return self.last_year - self.first_year
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name, 'count': self.count, 'rating_sum': self.rating_sum,
+            'rated': self.rated, 'weighted_sum': self.weighted_sum,
+            'weighted_votes': self.weighted_votes, 'total_votes': self.total_votes,
+            'first_year': self.first_year, 'last_year': self.last_year, 'genres': self.genres,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'DirectorStats':
+        s = cls(d['name'])
+        for key in ('count', 'rating_sum', 'rated', 'weighted_sum', 'weighted_votes',
+                    'total_votes', 'first_year', 'last_year', 'genres'):
+            setattr(s, key, d[key])
+        return s
+
+    def __repr__(self):
+        return f'<DirectorStats {self.name!r} {self.count} films mean={self.mean_rating}>'
+
+
+def build_director_stats(path: str, encoding: str = 'utf-8') -> Dict[str, DirectorStats]:
+    """Build the table in one pass; directors are grouped case-insensitively."""
+    stats: Dict[str, DirectorStats] = {}
+    with open_text(path, encoding=encoding, errors='replace') as f:
+        records = iter_records(f)
+        header = next(records, None)
+        if header is None:
+            return stats
+        director_idx = find_column(header, 'Director')
+        if director_idx is None:
+            raise RuntimeError('Could not locate Director column in header: ' + str(header))
+        rating_idx = find_column(header, 'Rating')
+        votes_idx = find_column(header, 'Votes')
+        year_idx = find_column(header, 'Year')
+        genre_idx = find_column(header, 'Genre')
+
+        def cell(row: List[str], idx: Optional[int]) -> str:
+            return row[idx] if idx is not None and idx < len(row) else ''
+
+        for row in records:
+            director = cell(row, director_idx).strip()
+            if not director:
+                continue
+            key = director.lower()
+            s = stats.get(key)
+            if s is None:
+                s = stats[key] = DirectorStats(director)
+            genres = [g.strip() for g in cell(row, genre_idx).split(',') if g.strip()]
+            s.add(parse_number(cell(row, rating_idx)), parse_number(cell(row, votes_idx)),
+                  parse_number(cell(row, year_idx)), genres)
+    return stats
+
+
+def sidecar_path(path: str) -> str:
+    return path + SIDECAR_SUFFIX
+
+
+def save_director_stats(path: str, stats: Dict[str, DirectorStats], st: os.stat_result) -> None:
+    """Save the table with the size/mtime of the CSV it was built from (st)."""
+    out = sidecar_path(path)
+    tmp = out + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                   'directors': [s.to_dict() for s in stats.values()]}, f)
+    os.replace(tmp, out)
+
+
+def director_stats(path: str, rebuild: bool = False) -> Dict[str, DirectorStats]:
+    """Return the table for path, using the saved sidecar when it is current."""
+    st = os.stat(path)
+    side = sidecar_path(path)
+    if not rebuild and os.path.exists(side):
+        try:
+            with open(side, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('size') == st.st_size and saved.get('mtime_ns') == st.st_mtime_ns:
+                return {d['name'].lower(): DirectorStats.from_dict(d) for d in saved['directors']}
+        except (OSError, ValueError, KeyError):
+            pass  # unreadable sidecar -> rebuild it
+    stats = build_director_stats(path)
+    save_director_stats(path, stats, st)
+    return stats
+
+
+def _ranking_key(by: str):
+    if by not in RANKINGS:
+        raise ValueError(f'ranking must be one of {RANKINGS}, got {by!r}')
+    return lambda s: (getattr(s, by), s.count, s.name)
+
+
+def top_directors(stats: Dict[str, DirectorStats], n: int = 20, min_films: int = 1,
+                  by: str = 'mean_rating', select_by: Optional[str] = None) -> List[DirectorStats]:
+    """n directors with at least min_films movies, ordered by `by` (highest first).
+
+    Without select_by these are the n best by `by`. With select_by the n
+    directors are chosen by that ranking first and then ordered by `by`:
+    select_by='count', by='mean_rating' gives the n most prolific directors
+    ordered by mean rating. Ties are broken by movie count, then by name.
+    """
+    order_key = _ranking_key(by)
+    select_key = order_key if select_by is None else _ranking_key(select_by)
+    candidates = [s for s in stats.values() if s.count >= min_films and getattr(s, by) is not None]
+    if select_by is not None:
+        candidates = [s for s in candidates if getattr(s, select_by) is not None]
+    chosen = heapq.nlargest(n, candidates, key=select_key)
+    return chosen if select_by is None else sorted(chosen, key=order_key, reverse=True)
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        print('Usage: python director_stats.py <path-to-csv> [n] [min-films] [ranking] [select-by]')
+        sys.exit(1)
+
+    path = sys.argv[1]
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    min_films = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    by = sys.argv[4] if len(sys.argv) > 4 else 'mean_rating'
+    select_by = sys.argv[5] if len(sys.argv) > 5 else 'count'
+    table = director_stats(path)
+    print(f'{len(table)} directors; top {n} by {select_by} with at least {min_films} films, '
+          f'ordered by {by}:')
+    for s in top_directors(table, n, min_films, by, select_by):
+        top_genres = sorted(s.genres.items(), key=lambda x: x[1], reverse=True)[:3]
+        weighted = 'n/a' if s.weighted_rating is None else f'{s.weighted_rating:.2f}'
+        print(f'{s.name}: {s.count} films, mean {s.mean_rating:.2f}, weighted {weighted}, '
+              f'{s.total_votes} votes, {s.first_year}-{s.last_year}, {top_genres}')
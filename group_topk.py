@@ -0,0 +1,260 @@
+"""
+Top-K best-rated movies per certificate and per genre, with bounded memory.
+
+Movies are ranked by a vote-weighted (Bayesian) rating, so a 9.0 with 40
+votes does not beat an 8.6 with a million:
+
+    score = v / (v + m) * R + m / (v + m) * C
+
+R is the movie's rating, v its votes, C the prior mean rating and m the
+number of votes the prior counts for (prior_votes). Each group keeps a
+min-heap of at most K movies, so memory is O(groups x K) however many rows
+are read. A movie listing several genres is offered to each of them.
+Certificates are grouped as in categorical_columns (case and surrounding
+whitespace ignored, shown under the first spelling in the file); genres are
+kept as spelled, as genre_counts does.
+
+Partial results are mergeable (MovieTopK.merge), which is how
+top_k_parallel() combines worker processes that each read one chunk of the
+file, and how TopKAggregator runs as a pipeline.py stage. The chunks come
+from the record offset index (record_index.py), which top_k_parallel
+creates as <csv>.idx if it is missing and the directory is writable.
+
+The ranking needs C before the top-K pass, so:
+ - with prior_mean given, the file is read once
+ - otherwise C is the mean Rating from a saved range index (<csv>.ranges)
+   if a current one exists, and from an extra pass over the file (only
+   Rating is converted) if not: two passes in total. The range index is
+   never built for this.
+"""
+
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from categorical_columns import CategoryGroups
+from compressed_input import detect_compression, open_text
+from csv_records import find_column, iter_records, parse_number
+from pipeline import Aggregator
+from range_index import saved_range_index
+from record_index import RecordIndex
+
+DEFAULT_K = 10
+# votes the prior mean is worth (IMDb's Top 250 has used 25,000)
+DEFAULT_PRIOR_VOTES = 25000
+
+# heap entry: (score, votes, title, year, rating) - fully comparable, so ties
+# are broken the same way in every worker
+Entry = Tuple[float, int, str, str, float]
+
+
+def bayesian_rating(rating: float, votes: float, prior_mean: float, prior_votes: float) -> float:
+    total = votes + prior_votes
+    if total <= 0:
+        return prior_mean
+    return (votes * rating + prior_votes * prior_mean) / total
+
+
+class GroupTopK:
+    """Fixed-size min-heap of the K best entries for every group."""
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.heaps: Dict[Hashable, List[Entry]] = {}
+
+    def add(self, group: Hashable, entry: Entry) -> None:
+        heap = self.heaps.get(group)
+        if heap is None:
+            heap = self.heaps[group] = []
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def merge(self, other: 'GroupTopK') -> None:
+        for group, heap in other.heaps.items():
+            for entry in heap:
+                self.add(group, entry)
+
+    def results(self) -> Dict[Hashable, List[Entry]]:
+        """group -> entries, best first."""
+        return {group: sorted(heap, reverse=True) for group, heap in self.heaps.items()}
+
+
+class MovieTopK:
+    """Per-certificate and per-genre top-K over parsed CSV records."""
+
+    def __init__(self, prior_mean: float, k: int = DEFAULT_K,
+                 prior_votes: float = DEFAULT_PRIOR_VOTES):
+        self.prior_mean = prior_mean
+        self.prior_votes = prior_votes
+        self.certificates = CategoryGroups()
+        self.by_certificate = GroupTopK(k)
+        self.by_genre = GroupTopK(k)
+
+    def bind(self, header: List[str]) -> None:
+        self.idx = {}
+        for name in ('Title', 'Year', 'Certificate', 'Genre', 'Rating', 'Votes'):
+            i = find_column(header, name)
+            if i is None:
+                raise RuntimeError(f'Could not locate {name} column in header: {header}')
+            self.idx[name] = i
+        self.width = max(self.idx.values())
+
+    def consume(self, records: Iterable[List[str]], seq: int = 0) -> None:
+        """Add records; (seq, row in records) orders them in the file (for certificate names)."""
+        idx = self.idx
+        for i, r in enumerate(records):
+            if len(r) <= self.width:
+                continue
+            rating = parse_number(r[idx['Rating']])
+            if rating is None:
+                continue
+            votes = parse_number(r[idx['Votes']]) or 0.0
+            score = bayesian_rating(rating, votes, self.prior_mean, self.prior_votes)
+            entry = (score, int(votes), r[idx['Title']].strip(), r[idx['Year']].strip(), rating)
+            cert = r[idx['Certificate']].strip()
+            if cert:
+                self.by_certificate.add(self.certificates.add(cert, (seq, i)), entry)
+            for g in r[idx['Genre']].split(','):
+                g = g.strip()
+                if g:
+                    self.by_genre.add(g, entry)
+
+    def merge(self, other: 'MovieTopK') -> None:
+        self.certificates.merge(other.certificates)
+        self.by_certificate.merge(other.by_certificate)
+        self.by_genre.merge(other.by_genre)
+
+    def results(self) -> Dict[str, Dict[str, List[Entry]]]:
+        by_cert = self.by_certificate.results()
+        return {'certificate': {self.certificates.name(key): by_cert[key]
+                                for key in self.certificates.keys() if key in by_cert},
+                'genre': self.by_genre.results()}
+
+
+class TopKAggregator(Aggregator):
+    """MovieTopK as a pipeline.py stage."""
+
+    def __init__(self, prior_mean: float, k: int = DEFAULT_K,
+                 prior_votes: float = DEFAULT_PRIOR_VOTES):
+        self.topk = MovieTopK(prior_mean, k, prior_votes)
+
+    def bind(self, header):
+        self.topk.bind(header)
+
+    def consume(self, batch):
+        self.topk.consume(batch, batch.seq)
+
+    def merge(self, other):
+        self.topk.merge(other.topk)
+
+    def result(self):
+        return self.topk.results()
+
+
+def default_prior_mean(path: str, encoding: str = 'utf-8') -> float:
+    """Mean Rating over the file (from a saved range index if there is one)."""
+    index = saved_range_index(path)
+    if index is not None and find_column(list(index.columns), 'Rating') is not None:
+        # by_row is in file order, so C comes out exactly as from the scan below
+        values = [v for v in index.column('Rating').by_row if v == v]
+        return sum(values) / len(values) if values else 0.0
+    total = 0.0
+    count = 0
+    with open_text(path, encoding=encoding, errors='replace') as f:
+        records = iter_records(f)
+        header = next(records, None)
+        if header is None:
+            return 0.0  # empty file
+        rating_idx = find_column(header, 'Rating')
+        if rating_idx is None:
+            raise RuntimeError(f'Could not locate Rating column in header: {header}')
+        for r in records:
+            rating = parse_number(r[rating_idx]) if rating_idx < len(r) else None
+            if rating is not None:
+                total += rating
+                count += 1
+    return total / count if count else 0.0
+
+
+def top_k_by_group(path: str, k: int = DEFAULT_K, prior_mean: Optional[float] = None,
+                   prior_votes: float = DEFAULT_PRIOR_VOTES,
+                   encoding: str = 'utf-8') -> Dict[str, Dict[str, List[Entry]]]:
+    """{'certificate': {cert: [...]}, 'genre': {genre: [...]}}, best first.
+
+    One pass over the file if prior_mean is given (see the module docstring).
+    """
+    if prior_mean is None:
+        prior_mean = default_prior_mean(path, encoding)
+    topk = MovieTopK(prior_mean, k, prior_votes)
+    with open_text(path, encoding=encoding, errors='replace') as f:
+        records = iter_records(f)
+        header = next(records, None)
+        if header is None:
+            return topk.results()
+        topk.bind(header)
+        topk.consume(records)
+    return topk.results()
+
+
+def _chunk_lines(path: str, begin: int, end: int, encoding: str):
+    """Decoded lines of path between byte offsets begin and end (record boundaries)."""
+    with open(path, 'rb') as f:
+        f.seek(begin)
+        pos = begin
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line.decode(encoding, errors='replace').replace('\r\n', '\n')
+
+
+def _top_k_chunk(path: str, header: List[str], first_row: int, begin: int, end: int, k: int,
+                 prior_mean: float, prior_votes: float, encoding: str) -> MovieTopK:
+    topk = MovieTopK(prior_mean, k, prior_votes)
+    topk.bind(header)
+    topk.consume(iter_records(_chunk_lines(path, begin, end, encoding)), first_row)
+    return topk
+
+
+def top_k_parallel(path: str, k: int = DEFAULT_K, workers: int = 4,
+                   prior_mean: Optional[float] = None,
+                   prior_votes: float = DEFAULT_PRIOR_VOTES,
+                   encoding: str = 'utf-8') -> Dict[str, Dict[str, List[Entry]]]:
+    """Same result as top_k_by_group, with chunks of the file read by worker processes.
+
+    Uses (and creates if needed) the record offset index <csv>.idx.
+    """
+    if workers <= 1 or detect_compression(path) is not None:
+        # compressed files have no seekable record offsets
+        return top_k_by_group(path, k, prior_mean, prior_votes, encoding)
+    if prior_mean is None:
+        prior_mean = default_prior_mean(path, encoding)
+    index = RecordIndex(path, encoding)
+    chunks = [(start,) + index.byte_range(start, stop) for start, stop in index.chunks(workers)]
+    merged = MovieTopK(prior_mean, k, prior_votes)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_top_k_chunk, path, index.header, start, begin, end, k,
+                               prior_mean, prior_votes, encoding) for start, begin, end in chunks]
+        for fut in futures:
+            merged.merge(fut.result())
+    return merged.results()
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        print('Usage: python group_topk.py <path-to-csv> [k] [workers]')
+        sys.exit(1)
+
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    n_workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    res = top_k_parallel(sys.argv[1], k, n_workers)
+    for kind in ('certificate', 'genre'):
+        for group, entries in sorted(res[kind].items()):
+            print(f'{kind} {group}:')
+            for score, votes, title, year, rating in entries:
+                print(f'   {score:.3f}  {title} ({year})  rating {rating}, {votes} votes')
@@ -0,0 +1,252 @@
+"""
+Join the IMDB CSV with a side table (box office, director metadata, ...).
+
+Rows are matched on the same Title+Year key that remove_duplicates uses
+(title stripped, unquoted and lower-cased; year stripped and unquoted).
+
+hash_join(left_path, right_path, output_path, how) builds a hash table from
+the smaller file and streams the larger one past it. Supported joins:
+ - 'inner': left+right for every matching pair
+ - 'left':  like inner, plus unmatched left rows padded with empty fields
+ - 'anti':  left rows that have no match on the right
+
+If the build side grows past the memory budget (see memory_budget.py),
+both inputs are split into partition files by a hash of the key (Grace
+hash join) and each pair of partitions is joined on its own, recursing if
+a partition is still too big.
+"""
+
+import os
+import sys
+import tempfile
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from compressed_input import open_text
+from csv_records import find_column, format_record, iter_records
+from memory_budget import MemoryTracker, record_size
+
+JOIN_TYPES = ('inner', 'left', 'anti')
+# partitions still too big after this many re-partitions are joined in memory
+MAX_PARTITION_DEPTH = 3
+MAX_PARTITIONS = 256
+
+
+class BuildTooLarge(Exception):
+    """Raised internally when the hash table exceeds the memory budget."""
+
+
+def join_key(record: List[str], title_idx: int, year_idx: int) -> Optional[Tuple[str, str]]:
+    """Title+Year key normalized like remove_duplicates (None for short rows)."""
+    if max(title_idx, year_idx) >= len(record):
+        return None
+    title = record[title_idx].strip().strip('"').lower()
+    year = record[year_idx].strip().strip('"')
+    return (title, year)
+
+
+class _Side:
+    """One join input: path, header and key column positions."""
+
+    def __init__(self, path: str, encoding: str):
+        self.path = path
+        self.encoding = encoding
+        with open_text(path, encoding=encoding, errors='replace') as f:
+            self.header = next(iter_records(f), [])
+        self.title_idx = find_column(self.header, 'Title')
+        self.year_idx = find_column(self.header, 'Year')
+        if self.title_idx is None or self.year_idx is None:
+            raise ValueError(f'{path}: Title and Year columns are required, header is {self.header}')
+
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def rows(self):
+        """Yield (key, record) for every data row."""
+        with open_text(self.path, encoding=self.encoding, errors='replace') as f:
+            records = iter_records(f)
+            next(records, None)  # header
+            for r in records:
+                yield join_key(r, self.title_idx, self.year_idx), r
+
+
+def hash_join(left_path: str, right_path: str, output_path: str, how: str = 'inner',
+              memory_budget: Optional[int] = None, encoding: str = 'utf-8') -> int:
+    """Join left_path with right_path on Title+Year and write the result to output_path.
+
+    The output header is the left header followed by the right columns other
+    than Title/Year ('anti' keeps only the left columns). memory_budget
+    defaults to the global budget. Returns the number of data rows written.
+    """
+    if how not in JOIN_TYPES:
+        raise ValueError(f'how must be one of {JOIN_TYPES}, got {how!r}')
+    left = _Side(left_path, encoding)
+    right = _Side(right_path, encoding)
+
+    right_keep = [i for i in range(len(right.header)) if i not in (right.title_idx, right.year_idx)]
+    out_header = list(left.header)
+    if how != 'anti':
+        out_header += [right.header[i] for i in right_keep]
+
+    with open(output_path, 'w', encoding='utf-8', newline='') as fout:
+        fout.write(format_record(out_header))
+        writer = _JoinWriter(fout, how, right_keep, len(left.header))
+        _join(left, right, writer, how, memory_budget, 0)
+    return writer.written
+
+
+class _JoinWriter:
+    """Formats joined rows in the output column order."""
+
+    def __init__(self, fout, how: str, right_keep: List[int], left_width: int):
+        self.fout = fout
+        self.how = how
+        self.right_keep = right_keep
+        self.left_width = left_width
+        self.written = 0
+
+    def _pad_left(self, lrow: List[str]) -> List[str]:
+        if len(lrow) < self.left_width:
+            return lrow + [''] * (self.left_width - len(lrow))
+        return lrow[:self.left_width]
+
+    def matched(self, lrow: List[str], rrow: List[str]) -> None:
+        extra = [rrow[i] if i < len(rrow) else '' for i in self.right_keep]
+        self.fout.write(format_record(self._pad_left(lrow) + extra))
+        self.written += 1
+
+    def unmatched(self, lrow: List[str]) -> None:
+        row = self._pad_left(lrow)
+        if self.how == 'left':
+            row = row + [''] * len(self.right_keep)
+        self.fout.write(format_record(row))
+        self.written += 1
+
+
+def _join(left: _Side, right: _Side, writer: _JoinWriter, how: str,
+          memory_budget: Optional[int], depth: int) -> None:
+    """Join two inputs in memory, falling back to partitioning when too big."""
+    build_left = left.size() < right.size()
+    build = left if build_left else right
+    enforce = depth < MAX_PARTITION_DEPTH
+    try:
+        table = _build(build, MemoryTracker('join', memory_budget), enforce)
+    except BuildTooLarge:
+        _grace_join(left, right, writer, how, memory_budget, depth)
+        return
+
+    if build_left:
+        _probe_with_left_built(table, right, writer, how)
+    else:
+        _probe_with_right_built(table, left, writer, how)
+
+
+def _build(side: _Side, tracker: MemoryTracker, enforce: bool) -> Tuple[Dict, List[List[str]]]:
+    """Hash table key -> list of records; keyless rows are returned separately."""
+    table: Dict[Tuple[str, str], List[List[str]]] = {}
+    keyless: List[List[str]] = []
+    for key, r in side.rows():
+        if key is None:
+            keyless.append(r)
+        else:
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = [r]
+            else:
+                bucket.append(r)
+        if enforce:
+            tracker.add(record_size(r))
+            if tracker.over_budget():
+                raise BuildTooLarge()
+    return table, keyless
+
+
+def _probe_with_right_built(built, left: _Side, writer: _JoinWriter, how: str) -> None:
+    table, _ = built
+    for key, lrow in left.rows():
+        matches = table.get(key) if key is not None else None
+        if how == 'anti':
+            if not matches:
+                writer.unmatched(lrow)
+        elif matches:
+            for rrow in matches:
+                writer.matched(lrow, rrow)
+        elif how == 'left':
+            writer.unmatched(lrow)
+
+
+def _probe_with_left_built(built, right: _Side, writer: _JoinWriter, how: str) -> None:
+    table, keyless = built
+    matched = set()
+    for key, rrow in right.rows():
+        if key is None:
+            continue
+        lrows = table.get(key)
+        if not lrows:
+            continue
+        matched.add(key)
+        if how != 'anti':
+            for lrow in lrows:
+                writer.matched(lrow, rrow)
+    if how == 'inner':
+        return
+    # left rows that never matched are emitted after the probe
+    for key, lrows in table.items():
+        if key not in matched:
+            for lrow in lrows:
+                writer.unmatched(lrow)
+    for lrow in keyless:
+        writer.unmatched(lrow)
+
+
+def _partition_of(key: Optional[Tuple[str, str]], depth: int, n_parts: int) -> int:
+    if key is None:
+        return 0
+    # salt with depth so a re-partitioned partition actually splits
+    data = f'{depth}\0{key[0]}\0{key[1]}'.encode('utf-8')
+    return zlib.crc32(data) % n_parts
+
+
+def _partition(side: _Side, tmpdir: str, prefix: str, depth: int, n_parts: int) -> List[str]:
+    """Split side into n_parts CSV files (each with the header) by key hash."""
+    paths = [os.path.join(tmpdir, f'{prefix}{p}.csv') for p in range(n_parts)]
+    outs = [open(p, 'w', encoding='utf-8', newline='') for p in paths]
+    try:
+        header_line = format_record(side.header)
+        for out in outs:
+            out.write(header_line)
+        for key, r in side.rows():
+            outs[_partition_of(key, depth, n_parts)].write(format_record(r))
+    finally:
+        for out in outs:
+            out.close()
+    return paths
+
+
+def _grace_join(left: _Side, right: _Side, writer: _JoinWriter, how: str,
+                memory_budget: Optional[int], depth: int) -> None:
+    tracker = MemoryTracker('join', memory_budget)
+    build_bytes = min(left.size(), right.size())
+    # in-memory records take several times their size on disk
+    n_parts = max(2, min(MAX_PARTITIONS, (build_bytes * 4) // tracker.budget + 1))
+    with tempfile.TemporaryDirectory(prefix='hash_join_') as tmpdir:
+        left_parts = _partition(left, tmpdir, 'left', depth, n_parts)
+        right_parts = _partition(right, tmpdir, 'right', depth, n_parts)
+        spilled = sum(os.path.getsize(p) for p in left_parts + right_parts)
+        tracker.record_spill(spilled, files=2 * n_parts)
+        for lpath, rpath in zip(left_parts, right_parts):
+            lpart = _Side(lpath, 'utf-8')
+            rpart = _Side(rpath, 'utf-8')
+            _join(lpart, rpart, writer, how, memory_budget, depth + 1)
+            os.remove(lpath)
+            os.remove(rpath)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4:
+        print('Usage: python hash_join.py <left.csv> <right.csv> <output.csv> [inner|left|anti]')
+        sys.exit(1)
+
+    join_type = sys.argv[4] if len(sys.argv) > 4 else 'inner'
+    n = hash_join(sys.argv[1], sys.argv[2], sys.argv[3], how=join_type)
+    print(f'Wrote {n} rows to {sys.argv[3]}')
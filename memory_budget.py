@@ -0,0 +1,161 @@
+"""
+One memory budget shared by all the operators that can spill to disk.
+
+The budget (in bytes) is read from the IMDB_MEMORY_BUDGET environment
+variable when the module is imported (default 256 MB) and can be changed
+with set_memory_budget(). Operators create a MemoryTracker, add the
+approximate size of everything they keep in memory, and switch to a
+spilling/partitioned strategy once tracker.over_budget() is True.
+
+Every spill is recorded per operator; spill_report() returns the totals.
+
+Functions / classes:
+ - set_memory_budget(nbytes), get_memory_budget()
+ - MemoryTracker(operator, budget=None)
+ - record_size(record), entry_size(key, value): footprint estimates
+ - SpillFile: temp file of pickled objects written and read back in order
+ - spill_report(), reset_spill_stats()
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+# rough per-entry overhead of a dict/set slot
+_DICT_ENTRY_OVERHEAD = 100
+
+
+def _budget_from_env() -> int:
+    raw = os.environ.get('IMDB_MEMORY_BUDGET', '').strip()
+    if not raw:
+        return DEFAULT_MEMORY_BUDGET
+    units = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+    mult = units.get(raw[-1].lower(), 1)
+    if mult != 1:
+        raw = raw[:-1]
+    try:
+        return int(float(raw) * mult)
+    except ValueError:
+        return DEFAULT_MEMORY_BUDGET
+
+
+_budget = _budget_from_env()
+_spill_stats: Dict[str, Dict[str, int]] = {}
+
+
+def set_memory_budget(nbytes: int) -> None:
+    """Set the memory budget (bytes) used by every spilling operator."""
+    global _budget
+    nbytes = int(nbytes)
+    if nbytes <= 0:
+        raise ValueError('memory budget must be positive')
+    _budget = nbytes
+
+
+def get_memory_budget() -> int:
+    return _budget
+
+
+def record_size(record: List[str]) -> int:
+    """Approximate in-memory footprint of one parsed record (list of str)."""
+    return sys.getsizeof(record) + sum(sys.getsizeof(f) for f in record)
+
+
+def entry_size(key: Any, value: Any = None) -> int:
+    """Approximate footprint of one dict/set entry."""
+    size = _DICT_ENTRY_OVERHEAD + sys.getsizeof(key)
+    if isinstance(key, tuple):
+        size += sum(sys.getsizeof(k) for k in key)
+    if value is not None:
+        size += sys.getsizeof(value)
+    return size
+
+
+class MemoryTracker:
+    """Approximate footprint of one operator's in-memory state."""
+
+    def __init__(self, operator: str, budget: Optional[int] = None):
+        self.operator = operator
+        self.budget = get_memory_budget() if budget is None else budget
+        self.used = 0
+        self.peak = 0
+
+    def add(self, nbytes: int) -> None:
+        self.used += nbytes
+        if self.used > self.peak:
+            self.peak = self.used
+
+    def release(self, nbytes: Optional[int] = None) -> None:
+        """Forget nbytes (or everything, if None) after state was freed or spilled."""
+        self.used = 0 if nbytes is None else max(0, self.used - nbytes)
+
+    def over_budget(self) -> bool:
+        return self.used > self.budget
+
+    def record_spill(self, nbytes: int, files: int = 1, items: int = 0) -> None:
+        stats = _spill_stats.setdefault(self.operator, {'bytes': 0, 'files': 0, 'items': 0, 'spills': 0})
+        stats['bytes'] += nbytes
+        stats['files'] += files
+        stats['items'] += items
+        stats['spills'] += 1
+
+
+def spill_report() -> Dict[str, Dict[str, int]]:
+    """operator -> {'bytes', 'files', 'items', 'spills'} written to disk so far."""
+    return {op: dict(stats) for op, stats in _spill_stats.items()}
+
+
+def reset_spill_stats() -> None:
+    _spill_stats.clear()
+
+
+class SpillFile:
+    """Temporary file of pickled objects, read back in the order written.
+
+    The file is deleted when read back with iter_and_remove() or close().
+    """
+
+    def __init__(self, prefix: str = 'spill_'):
+        fd, self.path = tempfile.mkstemp(prefix=prefix, suffix='.pkl')
+        self._f = os.fdopen(fd, 'wb')
+        self.items = 0
+
+    def write(self, obj: Any) -> None:
+        pickle.dump(obj, self._f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.items += 1
+
+    def size(self) -> int:
+        """Bytes written so far."""
+        if self._f.closed:
+            return os.path.getsize(self.path)
+        return self._f.tell()
+
+    def finish(self) -> int:
+        """Close for writing and return the file size in bytes."""
+        if not self._f.closed:
+            self._f.close()
+        return os.path.getsize(self.path)
+
+    def __iter__(self) -> Iterator[Any]:
+        self.finish()
+        with open(self.path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def iter_and_remove(self) -> Iterator[Any]:
+        try:
+            yield from self
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,500 @@
+"""
+Threaded read -> parse -> aggregate pipeline for the IMDB CSV.
+
+The readers used to do everything one row at a time on one thread: read a
+line, parse it, tokenize it, count it. Here the work is split into stages
+that run at the same time and hand work to each other in batches through
+bounded queues (so a slow stage throttles the others instead of letting
+memory grow):
+
+ reader thread  -- large byte buffers, cut on record boundaries -->
+ parser threads -- batches of parsed records -->
+ aggregator threads -- each runs every analysis on every batch
+
+The byte buffers are cut only at a newline outside quotes, so records whose
+Review contains newlines are never split, and each parser can decode and
+parse its buffer on its own. Input goes through compressed_input, so
+.gz/.bz2/.xz files work as well.
+
+On a free-threaded CPython build (3.13t+, GIL disabled) the parser and
+aggregator stages default to one thread per CPU; with the GIL they default
+to one thread each, which still overlaps I/O and decompression with parsing.
+
+An analysis is an Aggregator subclass (bind/consume/merge/result). The
+existing analyses are provided: CertificateAverage (Assignment 5),
+GenreCounts (Assignment 3), WordsByCertificate (Assignment 9) and
+TitlesByGenre (Assignment 7).
+"""
+
+import io
+import os
+import queue
+import sys
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from categorical_columns import CategoryGroups, tokenize, top_words
+from compressed_input import open_binary
+from csv_records import find_column, iter_records, split_record
+
+BUFFER_SIZE = 1024 * 1024
+QUEUE_DEPTH = 8
+
+_DONE = object()
+
+
+def free_threaded() -> bool:
+    """True when running on a CPython build with the GIL disabled."""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def default_workers() -> int:
+    return (os.cpu_count() or 1) if free_threaded() else 1
+
+
+def _last_record_end(data: bytes) -> int:
+    """Index just past the last newline in data that is outside quotes (0 if none).
+
+    data must start at a record boundary.
+    """
+    total = data.count(b'"')
+    pos = data.rfind(b'\n')
+    while pos >= 0:
+        if (total - data.count(b'"', pos)) % 2 == 0:
+            return pos + 1
+        pos = data.rfind(b'\n', 0, pos)
+    return 0
+
+
+def read_buffers(stream, buffer_size: int = BUFFER_SIZE, initial: bytes = b'') -> Iterator[bytes]:
+    """Yield byte buffers of roughly buffer_size that each hold whole records.
+
+    initial is data already read from the start of stream (at a record boundary).
+    """
+    carry = initial
+    while True:
+        block = stream.read(buffer_size)
+        if not block:
+            break
+        data = carry + block
+        cut = _last_record_end(data)
+        if cut == 0:
+            carry = data  # one record longer than the buffer; keep reading
+            continue
+        carry = data[cut:]
+        yield data[:cut]
+    if carry:
+        yield carry
+
+
+class Batch(list):
+    """A list of parsed records; seq is the position of its buffer in the file."""
+
+    def __init__(self, records=(), seq: int = 0):
+        super().__init__(records)
+        self.seq = seq
+
+
+def parse_buffer(buf: bytes, encoding: str = 'utf-8', seq: int = 0) -> Batch:
+    """Decode and parse one buffer of whole records into a batch."""
+    text = io.StringIO(buf.decode(encoding, errors='replace'), newline=None)
+    return Batch(iter_records(text), seq)
+
+
+class Aggregator:
+    """One analysis run as a pipeline stage.
+
+    bind() receives the header before any batch; consume() is called with
+    each Batch of records (batches can arrive out of file order; batch.seq
+    gives their order when it matters); merge() folds in another instance's partial
+    result (used when several aggregator threads run); result() returns the
+    final answer.
+    """
+
+    def bind(self, header: List[str]) -> None:
+        pass
+
+    def consume(self, batch: Batch) -> None:
+        raise NotImplementedError
+
+    def merge(self, other: 'Aggregator') -> None:
+        raise NotImplementedError
+
+    def result(self) -> Any:
+        raise NotImplementedError
+
+    @staticmethod
+    def _column(header: List[str], name: str) -> int:
+        idx = find_column(header, name)
+        if idx is None:
+            raise RuntimeError(f'Could not locate {name} column in header: {header}')
+        return idx
+
+
+class CertificateAverage(Aggregator):
+    """certificate -> average Rating, grouped as in categorical_columns (category_key).
+
+    Each group is named after its first spelling in the file, whatever
+    order the batches are consumed in.
+    """
+
+    def __init__(self, round_digits: Optional[int] = None):
+        self.round_digits = round_digits
+        self.groups = CategoryGroups()
+        self.totals: Dict[str, List] = {}
+
+    def bind(self, header):
+        self.cert_idx = self._column(header, 'Certificate')
+        self.rating_idx = self._column(header, 'Rating')
+        self.width = max(self.cert_idx, self.rating_idx)
+
+    def consume(self, batch):
+        totals = self.totals
+        for i, r in enumerate(batch):
+            if len(r) <= self.width:
+                continue
+            cert = r[self.cert_idx].strip()
+            if not cert:
+                continue
+            key = self.groups.add(cert, (batch.seq, i))
+            try:
+                rating = float(r[self.rating_idx])
+            except ValueError:
+                continue
+            acc = totals.get(key)
+            if acc is None:
+                totals[key] = [rating, 1]
+            else:
+                acc[0] += rating
+                acc[1] += 1
+
+    def merge(self, other):
+        self.groups.merge(other.groups)
+        for key, (total, count) in other.totals.items():
+            acc = self.totals.get(key)
+            if acc is None:
+                self.totals[key] = [total, count]
+            else:
+                acc[0] += total
+                acc[1] += count
+
+    def result(self):
+        out = {}
+        for key in self.groups.keys():
+            acc = self.totals.get(key)
+            if acc is None:
+                continue
+            avg = acc[0] / acc[1]
+            if self.round_digits is not None:
+                avg = round(avg, int(self.round_digits))
+            out[self.groups.name(key)] = avg
+        return out
+
+
+class GenreCounts(Aggregator):
+    """genre -> number of movies (a multi-genre movie counts once per genre)."""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+
+    def bind(self, header):
+        self.genre_idx = self._column(header, 'Genre')
+
+    def consume(self, batch):
+        counts = self.counts
+        for r in batch:
+            if self.genre_idx >= len(r):
+                continue
+            for g in r[self.genre_idx].split(','):
+                g = g.strip()
+                if g:
+                    counts[g] = counts.get(g, 0) + 1
+
+    def merge(self, other):
+        for g, n in other.counts.items():
+            self.counts[g] = self.counts.get(g, 0) + n
+
+    def result(self):
+        return dict(self.counts)
+
+
+class WordsByCertificate(Aggregator):
+    """certificate -> list of (word, count) sorted by count desc, like Assignment 9.
+
+    Certificates are grouped and named as in CertificateAverage. Words with
+    equal counts keep first-seen order (categorical_columns.top_words); the
+    position of a word's first occurrence is tracked as (batch seq, row,
+    word) so the order does not depend on thread timing.
+    """
+
+    def __init__(self, top_n: int = 10, min_word_len: int = 2):
+        self.top_n = top_n
+        self.min_word_len = min_word_len
+        self.groups = CategoryGroups()
+        # certificate key -> word -> [count, first position]
+        self.counts_by_cert: Dict[str, Dict[str, List]] = {}
+
+    def bind(self, header):
+        self.cert_idx = self._column(header, 'Certificate')
+        self.review_idx = self._column(header, 'Review')
+        self.width = max(self.cert_idx, self.review_idx)
+
+    def consume(self, batch):
+        seq = batch.seq
+        for i, r in enumerate(batch):
+            if len(r) <= self.width:
+                continue
+            cert = r[self.cert_idx].strip()
+            if not cert:
+                continue
+            key = self.groups.add(cert, (seq, i))
+            words = tokenize(r[self.review_idx], self.min_word_len)
+            if not words:
+                continue
+            bucket = self.counts_by_cert.get(key)
+            if bucket is None:
+                bucket = self.counts_by_cert[key] = {}
+            for j, w in enumerate(words):
+                entry = bucket.get(w)
+                if entry is None:
+                    bucket[w] = [1, (seq, i, j)]
+                else:
+                    entry[0] += 1
+                    # only an earlier batch can hold an earlier occurrence
+                    if seq < entry[1][0]:
+                        entry[1] = (seq, i, j)
+
+    def merge(self, other):
+        self.groups.merge(other.groups)
+        for key, theirs in other.counts_by_cert.items():
+            bucket = self.counts_by_cert.setdefault(key, {})
+            for w, (n, first) in theirs.items():
+                entry = bucket.get(w)
+                if entry is None:
+                    bucket[w] = [n, first]
+                else:
+                    entry[0] += n
+                    if first < entry[1]:
+                        entry[1] = first
+
+    def result(self):
+        out = {}
+        for key in self.groups.keys():
+            bucket = self.counts_by_cert.get(key)
+            if bucket is None:
+                continue
+            out[self.groups.name(key)] = top_words(
+                ((w, n, first) for w, (n, first) in bucket.items()), self.top_n)
+        return out
+
+
+class TitlesByGenre(Aggregator):
+    """title -> duration for movies listing genre, like Assignment 7's export.
+
+    As in Assignment 7 the last row with a given title wins, also across
+    parallel workers.
+    """
+
+    def __init__(self, genre: str):
+        self.genre = genre.strip().lower()
+        # title -> ((batch seq, row in batch), duration)
+        self.titles: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+
+    def bind(self, header):
+        self.title_idx = self._column(header, 'Title')
+        self.duration_idx = self._column(header, 'Duration (min)')
+        self.genre_idx = self._column(header, 'Genre')
+        self.width = max(self.title_idx, self.duration_idx, self.genre_idx)
+
+    def consume(self, batch):
+        for i, r in enumerate(batch):
+            if len(r) <= self.width:
+                continue
+            genres = [g.strip().lower() for g in r[self.genre_idx].split(',') if g.strip()]
+            if self.genre in genres:
+                dur_raw = r[self.duration_idx].strip()
+                try:
+                    duration = int(dur_raw)
+                except ValueError:
+                    duration = dur_raw
+                self._keep(r[self.title_idx].strip(), (batch.seq, i), duration)
+
+    def _keep(self, title, where, duration):
+        old = self.titles.get(title)
+        if old is None or old[0] < where:
+            self.titles[title] = (where, duration)
+
+    def merge(self, other):
+        for title, (where, duration) in other.titles.items():
+            self._keep(title, where, duration)
+
+    def result(self):
+        return {title: duration for title, (_, duration) in self.titles.items()}
+
+
+class Pipeline:
+    """Runs named aggregators over one CSV in a single threaded pass.
+
+    aggregators maps a name to a zero-argument factory (e.g. a class or a
+    lambda); each aggregator thread gets its own instances and the partial
+    results are merged at the end.
+    """
+
+    def __init__(self, path: str, aggregators: Dict[str, Callable[[], Aggregator]],
+                 parser_workers: Optional[int] = None, aggregator_workers: Optional[int] = None,
+                 buffer_size: int = BUFFER_SIZE, queue_depth: int = QUEUE_DEPTH,
+                 encoding: str = 'utf-8', decompress_workers: int = 1):
+        self.path = path
+        self.factories = aggregators
+        self.parser_workers = parser_workers or default_workers()
+        self.aggregator_workers = aggregator_workers or default_workers()
+        self.buffer_size = buffer_size
+        self.encoding = encoding
+        self.decompress_workers = decompress_workers
+        self._buffers: queue.Queue = queue.Queue(queue_depth)
+        self._batches: queue.Queue = queue.Queue(queue_depth)
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self._parsers_left = self.parser_workers
+        self._lock = threading.Lock()
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, e: BaseException) -> None:
+        self._errors.append(e)
+        self._stop.set()
+
+    def _reader(self, stream, initial: bytes) -> None:
+        try:
+            for seq, buf in enumerate(read_buffers(stream, self.buffer_size, initial)):
+                if not self._put(self._buffers, (seq, buf)):
+                    return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.parser_workers):
+                self._put(self._buffers, _DONE)
+
+    def _parser(self) -> None:
+        try:
+            while True:
+                item = self._get(self._buffers)
+                if item is _DONE:
+                    break
+                seq, buf = item
+                batch = parse_buffer(buf, self.encoding, seq)
+                if batch and not self._put(self._batches, batch):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            with self._lock:
+                self._parsers_left -= 1
+                last = self._parsers_left == 0
+            if last:
+                for _ in range(self.aggregator_workers):
+                    self._put(self._batches, _DONE)
+
+    def _aggregator(self, aggs: Dict[str, Aggregator]) -> None:
+        try:
+            while True:
+                batch = self._get(self._batches)
+                if batch is _DONE:
+                    return
+                for agg in aggs.values():
+                    agg.consume(batch)
+        except BaseException as e:
+            self._fail(e)
+
+    def _read_header(self, stream) -> Tuple[List[str], bytes]:
+        """Parse the header record; return it and the bytes read after it."""
+        data = b''
+        while True:
+            block = stream.read(self.buffer_size)
+            data += block
+            if _last_record_end(data) or not block:
+                break
+        if not data.strip():
+            return [], b''
+        # the header ends at the first newline outside quotes
+        pos = data.find(b'\n')
+        while pos >= 0 and data.count(b'"', 0, pos) % 2:
+            pos = data.find(b'\n', pos + 1)
+        if pos < 0:
+            pos = len(data)
+        text = data[:pos].decode(self.encoding, errors='replace').rstrip('\r')
+        return split_record(text), data[pos + 1:]
+
+    def run(self) -> Dict[str, Any]:
+        """Run the pipeline and return {name: result}."""
+        with open_binary(self.path, self.decompress_workers) as stream:
+            header, rest = self._read_header(stream)
+            workers = []
+            for _ in range(self.aggregator_workers):
+                aggs = {name: factory() for name, factory in self.factories.items()}
+                for agg in aggs.values():
+                    agg.bind(header)
+                workers.append(aggs)
+
+            threads = [threading.Thread(target=self._reader, args=(stream, rest), daemon=True)]
+            threads += [threading.Thread(target=self._parser, daemon=True)
+                        for _ in range(self.parser_workers)]
+            threads += [threading.Thread(target=self._aggregator, args=(aggs,), daemon=True)
+                        for aggs in workers]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        if self._errors:
+            raise self._errors[0]
+
+        merged = workers[0]
+        for other in workers[1:]:
+            for name, agg in merged.items():
+                agg.merge(other[name])
+        return {name: agg.result() for name, agg in merged.items()}
+
+
+def run_pipeline(path: str, **aggregators: Callable[[], Aggregator]) -> Dict[str, Any]:
+    """Shortcut: run_pipeline(path, genres=GenreCounts, words=WordsByCertificate)."""
+    return Pipeline(path, aggregators).run()
+
+
+def most_common_words_by_certificate(csv_path: str, top_n: int = 10,
+                                     min_word_len: int = 2) -> Dict[str, List]:
+    """Assignment 9's analysis expressed as a pipeline stage."""
+    return run_pipeline(csv_path, words=lambda: WordsByCertificate(top_n, min_word_len))['words']
+
+
+if __name__ == '__main__':
+    import time
+
+    if len(sys.argv) < 2:
+        print('Usage: python pipeline.py <path-to-csv>')
+        sys.exit(1)
+
+    print('Free-threaded build:', free_threaded(), '- workers per stage:', default_workers())
+    start = time.perf_counter()
+    results = run_pipeline(sys.argv[1], averages=lambda: CertificateAverage(round_digits=3),
+                           genres=GenreCounts, words=lambda: WordsByCertificate(top_n=5))
+    print(f'One pass in {time.perf_counter() - start:.2f} s')
+    print('Average rating by certificate:', results['averages'])
+    print('Genre counts:', results['genres'])
+    for cert, words in results['words'].items():
+        print(cert, ':', words)
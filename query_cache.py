@@ -0,0 +1,284 @@
+"""
+Cache the results of the queries we keep repeating (average rating for 'R',
+top words for 'PG-13', the Action export, ...).
+
+A result is stored under (query name, normalized arguments, fingerprint of
+the CSV file). The fingerprint changes whenever the file is rewritten, so a
+changed CSV never returns stale results; the old entries for that file are
+dropped the first time the new fingerprint is seen.
+
+Two tiers:
+ - memory: LRU of pickled results, evicted by total size in bytes; every
+   hit unpickles a fresh copy, so a caller that modifies a returned
+   dict/list does not change what later calls get
+ - disk (optional): one pickle file per entry in a cache directory, checked
+   on a memory miss and promoted back into memory when found
+
+Functions:
+ - configure_cache(max_bytes, disk_dir): replace the shared cache
+ - cached_query(name): decorator for functions taking (csv_path, ...)
+ - average_rating_for_certificate(path, certificate, round_digits)
+ - most_common_words_for_certificate(path, certificate, top_n, min_word_len)
+ - titles_by_genre(path, genre), export_titles_by_genre(path, genre)
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from Assignment_5_UserDefinedFunctions import average_rating_for_certificate as _average_rating
+from categorical_columns import category_key
+from compressed_input import open_text, source_fingerprint
+from csv_records import find_column, iter_records
+from spilling_operators import most_common_words_by_certificate as _words_by_certificate
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_MISSING = object()
+
+
+def _normalize(value: Any) -> Any:
+    """Strings are compared ignoring case and surrounding whitespace."""
+    if isinstance(value, str):
+        return value.strip().lower()
+    return value
+
+
+def _path_tag(path: str) -> str:
+    return hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:12]
+
+
+class QueryCache:
+    """Two-tier (memory LRU + optional disk) cache keyed by query and file fingerprint."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, disk_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._entries: 'OrderedDict[Tuple, bytes]' = OrderedDict()
+        self._bytes = 0
+        self._fingerprints: Dict[str, str] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key: Tuple) -> str:
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        # key[1] / key[2] are the path tag and fingerprint, so one file's
+        # entries (and stale ones) can be found by name
+        return os.path.join(self.disk_dir, f'{key[1]}_{key[2]}_{digest}.pkl')
+
+    def check_source(self, path: str) -> str:
+        """Return path's fingerprint, invalidating its entries if it changed."""
+        fp = source_fingerprint(path)
+        tag = _path_tag(path)
+        old = self._fingerprints.get(tag)
+        if old != fp:
+            if old is not None:
+                self.invalidate(path)
+            self._purge_disk(tag, keep=fp)
+        self._fingerprints[tag] = fp
+        return fp
+
+    def _purge_disk(self, tag: Optional[str], keep: Optional[str] = None) -> None:
+        """Remove disk entries for tag (all tags if None) except fingerprint keep."""
+        if self.disk_dir is None:
+            return
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.pkl'):
+                continue
+            parts = name.split('_', 2)
+            if len(parts) < 3 or (tag is not None and parts[0] != tag):
+                continue
+            if keep is not None and parts[1] == keep:
+                continue
+            os.remove(os.path.join(self.disk_dir, name))
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop the entries for path (or every entry if path is None)."""
+        tag = None if path is None else _path_tag(path)
+        for key in [k for k in self._entries if tag is None or k[1] == tag]:
+            self._bytes -= len(self._entries.pop(key))
+        self._purge_disk(tag)
+        if tag is not None:
+            self._fingerprints.pop(tag, None)
+
+    def get(self, key: Tuple) -> Any:
+        """Return the cached value for key, or _MISSING."""
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pickle.loads(data)
+        if self.disk_dir is not None:
+            disk_path = self._disk_path(key)
+            if os.path.exists(disk_path):
+                with open(disk_path, 'rb') as f:
+                    stored_key, value = pickle.load(f)
+                if stored_key == key:
+                    self.disk_hits += 1
+                    self._remember(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+                    return value
+        self.misses += 1
+        return _MISSING
+
+    def put(self, key: Tuple, value: Any) -> None:
+        self._remember(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        if self.disk_dir is not None:
+            tmp = self._disk_path(key) + '.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump((key, value), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._disk_path(key))
+
+    def _remember(self, key: Tuple, data: bytes) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        if len(data) > self.max_bytes:
+            return  # larger than the whole memory tier; disk only
+        self._entries[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'bytes': self._bytes,
+                'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses}
+
+
+_cache = QueryCache()
+
+
+def configure_cache(max_bytes: int = DEFAULT_MAX_BYTES, disk_dir: Optional[str] = None) -> QueryCache:
+    """Replace the shared cache (e.g. to enable the disk tier) and return it."""
+    global _cache
+    _cache = QueryCache(max_bytes, disk_dir)
+    return _cache
+
+
+def get_cache() -> QueryCache:
+    return _cache
+
+
+def cached_query(name: str) -> Callable:
+    """Cache a function whose first argument is the CSV path.
+
+    The remaining arguments are bound to the function's parameters (defaults
+    filled in) and normalized (strings stripped and lower-cased) to build the
+    key, so f(p, 'R', 2), f(p, ' r ', round_digits=2) share one entry.
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(csv_path: str, *args, **kwargs):
+            cache = _cache
+            fp = cache.check_source(csv_path)
+            bound = signature.bind(csv_path, *args, **kwargs)
+            bound.apply_defaults()
+            params = list(bound.arguments.items())[1:]  # csv_path is keyed by tag/fingerprint
+            key = (name, _path_tag(csv_path), fp,
+                   tuple((k, _normalize(v)) for k, v in params))
+            value = cache.get(key)
+            if value is _MISSING:
+                value = func(csv_path, *args, **kwargs)
+                cache.put(key, value)
+            return value
+        return wrapper
+    return decorator
+
+
+@cached_query('average_rating_for_certificate')
+def average_rating_for_certificate(csv_path: str, certificate: str,
+                                   round_digits: Optional[int] = None) -> Optional[float]:
+    """Cached version of Assignment 5's average_rating_for_certificate."""
+    return _average_rating(csv_path, certificate, round_digits=round_digits)
+
+
+@cached_query('most_common_words_by_certificate')
+def most_common_words_by_certificate(csv_path: str, top_n: int = 10,
+                                     min_word_len: int = 2) -> Dict[str, List[Tuple[str, int]]]:
+    """Cached certificate -> [(word, count), ...] for every certificate (one pass)."""
+    return _words_by_certificate(csv_path, top_n=top_n, min_word_len=min_word_len)
+
+
+def most_common_words_for_certificate(csv_path: str, certificate: str, top_n: int = 10,
+                                      min_word_len: int = 2) -> List[Tuple[str, int]]:
+    """Top words for one certificate; all certificates share one cached pass.
+
+    Spellings of the certificate that differ in case/whitespace are one
+    group (categorical_columns.category_key), as in the other group-bys.
+    """
+    by_cert = most_common_words_by_certificate(csv_path, top_n, min_word_len)
+    target = category_key(certificate)
+    for cert, words in by_cert.items():
+        if category_key(cert) == target:
+            return words
+    return []
+
+
+@cached_query('titles_by_genre')
+def titles_by_genre(csv_path: str, genre: str) -> Dict[str, Any]:
+    """title -> duration for movies listing genre, like Assignment 7's export."""
+    user_genre = genre.strip().lower()
+    results: Dict[str, Any] = {}
+    with open_text(csv_path, encoding='utf-8', errors='replace') as f:
+        records = iter_records(f)
+        cols = next(records, None)
+        if cols is None:
+            return results
+        title_idx = find_column(cols, 'Title')
+        duration_idx = find_column(cols, 'Duration (min)')
+        genre_idx = find_column(cols, 'Genre')
+        if title_idx is None or duration_idx is None or genre_idx is None:
+            raise RuntimeError('Required columns not found in CSV header.')
+        for row in records:
+            if max(title_idx, duration_idx, genre_idx) >= len(row):
+                continue
+            genres = [g.strip().lower() for g in row[genre_idx].split(',') if g.strip()]
+            if user_genre in genres:
+                dur_raw = row[duration_idx].strip()
+                try:
+                    duration = int(dur_raw)
+                except ValueError:
+                    duration = dur_raw
+                results[row[title_idx].strip()] = duration
+    return results
+
+
+def export_titles_by_genre(csv_path: str, genre: str) -> str:
+    """Write movies_<genre>.txt like Assignment 7 (from the cache) and return its name."""
+    results = titles_by_genre(csv_path, genre)
+    user_genre = genre.strip().lower()
+    out_name = f"movies_{user_genre.replace(' ', '_')}.txt"
+    with open(out_name, 'w', encoding='utf-8') as outf:
+        outf.write(repr(results))
+    return out_name
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    if len(sys.argv) < 2:
+        print('Usage: python query_cache.py <path-to-csv> [cache-dir]')
+        sys.exit(1)
+
+    path = sys.argv[1]
+    if len(sys.argv) > 2:
+        configure_cache(disk_dir=sys.argv[2])
+    for attempt in ('first', 'repeat'):
+        start = time.perf_counter()
+        avg = average_rating_for_certificate(path, 'R', round_digits=3)
+        words = most_common_words_for_certificate(path, 'PG-13', top_n=5)
+        action = titles_by_genre(path, 'Action')
+        elapsed = time.perf_counter() - start
+        print(f'{attempt}: R average {avg}, PG-13 words {words}, {len(action)} Action titles '
+              f'({elapsed * 1000:.1f} ms)')
+    print('Cache:', get_cache().stats())
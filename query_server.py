@@ -0,0 +1,293 @@
+"""
+Resident query server: load the IMDB CSV once and answer queries over HTTP/JSON.
+
+Every command-line query used to pay for interpreter start-up and a full
+parse of the CSV. This server loads the file once with the columnar loader
+(categorical_columns.load_columnar), precomputes the lookup tables below and
+keeps them in memory, so a query is a dictionary lookup:
+ - GET /genre?name=Action[&limit=N]          movies listing the genre
+ - GET /certificate-average?certificate=R     average Rating for a certificate
+ - GET /director?name=Christopher Nolan       movies by a director
+ - GET /top-words?certificate=PG-13[&n=10]    most common review words
+ - GET /health                                row count and file fingerprint
+
+It is a small asyncio HTTP/1.1 server (keep-alive, many concurrent clients)
+bound to localhost by default. The file's fingerprint is polled and the data
+is reloaded in a worker thread when it changes; queries keep being answered
+from the old data until the new tables are swapped in.
+
+MovieQueryServer.query(route, params) answers a query without the network,
+which is the easy way to check results against a local file.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from categorical_columns import (average_rating_by_certificate, load_columnar,
+                                 most_common_words_by_certificate)
+from compressed_input import source_fingerprint
+
+MAX_TOP_WORDS = 100
+DEFAULT_LIMIT = 100
+MAX_REQUEST_HEAD = 64 * 1024
+
+log = logging.getLogger(__name__)
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+
+
+class DatasetIndex:
+    """Lookup tables built once from the CSV; read-only afterwards."""
+
+    def __init__(self, path: str):
+        self.fingerprint = source_fingerprint(path)
+        table = load_columnar(path, keep=('Title', 'Review'))
+        self.rows = len(table)
+        titles = table.column('Title') or [''] * self.rows
+        years = table.column('Year')
+        ratings = table.column('Rating')
+        genres = table.column('Genre')
+        directors = table.column('Director')
+
+        def movie(i: int) -> Dict[str, Any]:
+            rating = ratings[i] if ratings is not None else float('nan')
+            return {
+                'title': titles[i],
+                'year': years[i] if years is not None else '',
+                'rating': None if rating != rating else rating,
+                'director': directors[i] if directors is not None else '',
+                'genres': genres[i] if genres is not None else [],
+            }
+
+        self.by_genre: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_director: Dict[str, List[Dict[str, Any]]] = {}
+        for i in range(self.rows):
+            m = movie(i)
+            for g in m['genres']:
+                self.by_genre.setdefault(g.lower(), []).append(m)
+            if m['director']:
+                self.by_director.setdefault(m['director'].lower(), []).append(m)
+
+        # both group-bys merge certificates that differ only in case/whitespace,
+        # so each lower-cased key below comes from exactly one group
+        self.cert_average = {c.lower(): (c, avg) for c, avg in average_rating_by_certificate(table).items()}
+        self.top_words = {c.lower(): words for c, words
+                          in most_common_words_by_certificate(table, top_n=MAX_TOP_WORDS).items()}
+
+
+def _content_length(headers: Dict[str, str]) -> Optional[int]:
+    """Length of the request body, or None if it cannot be framed."""
+    if 'transfer-encoding' in headers:
+        return None  # chunked bodies are not supported
+    raw = headers.get('content-length', '0') or '0'
+    if not (raw.isascii() and raw.isdigit()):
+        return None
+    return int(raw)
+
+
+async def _discard_body(reader: asyncio.StreamReader, length: int) -> None:
+    while length > 0:
+        data = await reader.read(min(length, 64 * 1024))
+        if not data:
+            raise asyncio.IncompleteReadError(b'', length)
+        length -= len(data)
+
+
+def _param(params: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = params.get(name)
+    if not values:
+        return None
+    return values[0].strip()
+
+
+def _int_param(params: Dict[str, List[str]], name: str, default: int) -> int:
+    raw = _param(params, name)
+    if raw is None or raw == '':
+        return default
+    value = int(raw)  # ValueError -> 400
+    if value < 0:
+        raise ValueError(f'{name} must not be negative')
+    return value
+
+
+class MovieQueryServer:
+    """asyncio HTTP/JSON server over a resident DatasetIndex."""
+
+    def __init__(self, csv_path: str, host: str = '127.0.0.1', port: int = 8000,
+                 reload_interval: float = 2.0):
+        self.csv_path = csv_path
+        self.host = host
+        self.port = port
+        self.reload_interval = reload_interval
+        self.index: Optional[DatasetIndex] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self._clients: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    # -- queries -----------------------------------------------------------
+
+    def query(self, route: str, params: Dict[str, List[str]]) -> Tuple[int, Any]:
+        """Answer one query; returns (HTTP status, JSON-serializable payload)."""
+        index = self.index
+        if index is None:
+            index = self.index = DatasetIndex(self.csv_path)
+        try:
+            if route == '/genre':
+                name = _param(params, 'name')
+                if not name:
+                    return 400, {'error': 'name is required'}
+                movies = index.by_genre.get(name.lower(), [])
+                limit = _int_param(params, 'limit', DEFAULT_LIMIT)
+                return 200, {'genre': name, 'count': len(movies), 'movies': movies[:limit]}
+            if route == '/certificate-average':
+                cert = _param(params, 'certificate')
+                if not cert:
+                    return 400, {'error': 'certificate is required'}
+                found = index.cert_average.get(cert.lower())
+                return 200, {'certificate': cert, 'average': found[1] if found else None}
+            if route == '/director':
+                name = _param(params, 'name')
+                if not name:
+                    return 400, {'error': 'name is required'}
+                movies = index.by_director.get(name.lower(), [])
+                return 200, {'director': name, 'count': len(movies), 'movies': movies}
+            if route == '/top-words':
+                cert = _param(params, 'certificate')
+                if not cert:
+                    return 400, {'error': 'certificate is required'}
+                n = min(_int_param(params, 'n', 10), MAX_TOP_WORDS)
+                words = index.top_words.get(cert.lower(), [])[:n]
+                return 200, {'certificate': cert, 'words': [[w, c] for w, c in words]}
+            if route == '/health':
+                return 200, {'rows': index.rows, 'fingerprint': index.fingerprint}
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        return 404, {'error': f'unknown route {route}'}
+
+    # -- data loading ------------------------------------------------------
+
+    async def reload_if_changed(self) -> bool:
+        """Rebuild the index in a worker thread if the CSV changed; True if reloaded."""
+        loop = asyncio.get_running_loop()
+        fp = await loop.run_in_executor(None, source_fingerprint, self.csv_path)
+        if self.index is not None and fp == self.index.fingerprint:
+            return False
+        new_index = await loop.run_in_executor(None, DatasetIndex, self.csv_path)
+        self.index = new_index  # queries switch to the new tables atomically
+        return True
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload_if_changed()
+            except (OSError, ValueError):
+                # file is being rewritten; try again on the next tick
+                continue
+            except Exception:
+                # keep polling: a later version of the file may load fine
+                log.exception('reloading %s failed', self.csv_path)
+
+    # -- HTTP --------------------------------------------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode('latin-1').split('\r\n')
+                parts = lines[0].split()
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        k, v = line.split(':', 1)
+                        headers[k.strip().lower()] = v.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                length = _content_length(headers)
+                if length:
+                    # any body (also on a GET) is read and dropped so the
+                    # next request on the connection starts where it should
+                    try:
+                        await _discard_body(reader, length)
+                    except (asyncio.IncompleteReadError, ConnectionError):
+                        return
+                if len(parts) < 2:
+                    status, payload = 400, {'error': 'malformed request line'}
+                    keep_alive = False
+                elif length is None:
+                    # the end of the body (and so the next request) is unknown
+                    status, payload = 400, {'error': 'invalid Content-Length or Transfer-Encoding'}
+                    keep_alive = False
+                elif parts[0] != 'GET':
+                    status, payload = 405, {'error': 'only GET is supported'}
+                else:
+                    url = urlsplit(parts[1])
+                    try:
+                        status, payload = self.query(url.path, parse_qs(url.query))
+                    except Exception as e:  # keep serving other clients
+                        status, payload = 500, {'error': str(e)}
+                body = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    (f'HTTP/1.1 {status} {_REASONS.get(status, "")}\r\n'
+                     f'Content-Type: application/json\r\n'
+                     f'Content-Length: {len(body)}\r\n'
+                     f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n').encode('latin-1')
+                    + body)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        finally:
+            self._clients.pop(task, None)
+            writer.close()
+
+    async def start(self) -> None:
+        """Load the data, start listening and start watching the file."""
+        await self.reload_if_changed()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                  limit=MAX_REQUEST_HEAD)
+        # port 0 -> pick a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def close(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+        if self._server is not None:
+            self._server.close()
+        # idle keep-alive connections would otherwise block wait_closed()
+        clients = list(self._clients.items())
+        for _, writer in clients:
+            writer.close()
+        await asyncio.gather(*[t for t, _ in clients], return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        print('Usage: python query_server.py <path-to-csv> [port]')
+        sys.exit(1)
+
+    server = MovieQueryServer(sys.argv[1], port=int(sys.argv[2]) if len(sys.argv) > 2 else 8000)
+    print(f'Serving {sys.argv[1]} on http://{server.host}:{server.port}/ (Ctrl+C to stop)')
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,274 @@
+"""
+Range index over the numeric columns (Year, Rating, Duration, Votes, Metascore).
+
+Filters such as "Year between 1990 and 2000 and Rating >= 8 and Votes >
+100k" used to need a full scan with float() on every row. This module
+parses the numeric columns once and keeps, per column:
+ - the values in sorted order (array('d')) with their row ids (array('I')),
+   so a range predicate is two bisect calls
+ - the value of every row in row order (array('d'), NaN if missing), so the
+   other predicates can be checked on just the candidate rows
+
+A query takes the most selective predicate (found by bisect alone), walks
+its row ids and keeps the rows that satisfy the others. The matching rows
+are then read through the record offset index (record_index.py), so a
+selective query only touches the matching rows of the CSV.
+
+The index is saved beside the data as <csv>.ranges and rebuilt when the
+file's size or mtime changes. Row ids are data row numbers, the same as
+RecordIndex uses.
+"""
+
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from compressed_input import open_text
+from csv_records import find_column, iter_records, parse_number
+from record_index import RecordIndex
+
+RANGES_SUFFIX = '.ranges'
+NUMERIC_COLUMNS = ('Year', 'Rating', 'Duration (min)', 'Votes', 'Metascore')
+_MAGIC = b'IMDBRNG1'
+_HEADER = struct.Struct('<8sQQII')  # magic, file size, mtime_ns, rows, columns
+_COLUMN = struct.Struct('<HI')      # name length, number of non-missing values
+
+
+class Range:
+    """Bounds for one column; None means unbounded on that side."""
+
+    def __init__(self, low: Optional[float] = None, high: Optional[float] = None,
+                 include_low: bool = True, include_high: bool = True):
+        self.low = low
+        self.high = high
+        self.include_low = include_low
+        self.include_high = include_high
+
+    def contains(self, value: float) -> bool:
+        if value != value:  # NaN -> missing value never matches
+            return False
+        if self.low is not None and (value < self.low or (value == self.low and not self.include_low)):
+            return False
+        if self.high is not None and (value > self.high or (value == self.high and not self.include_high)):
+            return False
+        return True
+
+    def __repr__(self):
+        lo = '(' if not self.include_low else '['
+        hi = ')' if not self.include_high else ']'
+        return f'Range{lo}{self.low}, {self.high}{hi}'
+
+
+RangeSpec = Union[Range, Tuple[Optional[float], Optional[float]]]
+
+
+class ColumnIndex:
+    """Sorted (value, row id) pairs plus the per-row values of one column."""
+
+    def __init__(self, name: str, values: array, row_ids: array, by_row: array):
+        self.name = name
+        self.values = values
+        self.row_ids = row_ids
+        self.by_row = by_row
+
+    @classmethod
+    def build(cls, name: str, by_row: array) -> 'ColumnIndex':
+        order = sorted((i for i in range(len(by_row)) if by_row[i] == by_row[i]),
+                       key=by_row.__getitem__)
+        values = array('d', (by_row[i] for i in order))
+        return cls(name, values, array('I', order), by_row)
+
+    def bounds(self, r: Range) -> Tuple[int, int]:
+        """Positions [lo, hi) in the sorted values that satisfy r."""
+        lo, hi = 0, len(self.values)
+        if r.low is not None:
+            lo = (bisect_left if r.include_low else bisect_right)(self.values, r.low)
+        if r.high is not None:
+            hi = (bisect_right if r.include_high else bisect_left)(self.values, r.high)
+        return lo, max(lo, hi)
+
+    def count(self, r: Range) -> int:
+        lo, hi = self.bounds(r)
+        return hi - lo
+
+    def select(self, r: Range) -> array:
+        lo, hi = self.bounds(r)
+        return self.row_ids[lo:hi]
+
+
+def _as_range(spec: RangeSpec) -> Range:
+    if isinstance(spec, Range):
+        return spec
+    low, high = spec
+    return Range(low, high)
+
+
+class RangeIndex:
+    """Range indexes for the numeric columns of one CSV file."""
+
+    def __init__(self, columns: Dict[str, ColumnIndex], n_rows: int):
+        self.columns = columns
+        self.n_rows = n_rows
+
+    def column(self, name: str) -> ColumnIndex:
+        idx = find_column(list(self.columns), name)
+        if idx is None:
+            raise KeyError(f'no range index for column {name!r}; indexed: {list(self.columns)}')
+        return self.columns[list(self.columns)[idx]]
+
+    def query(self, conditions: Dict[str, RangeSpec]) -> List[int]:
+        """Sorted row ids that satisfy every condition.
+
+        conditions maps column name -> Range or (low, high) inclusive tuple,
+        e.g. {'Year': (1990, 2000), 'Rating': (8, None),
+              'Votes': Range(100000, None, include_low=False)}.
+        """
+        if not conditions:
+            return list(range(self.n_rows))
+        preds = [(self.column(name), _as_range(spec)) for name, spec in conditions.items()]
+        # drive the query from the predicate that matches the fewest rows
+        preds.sort(key=lambda p: p[0].count(p[1]))
+        driver, driver_range = preds[0]
+        others = [(col.by_row, r) for col, r in preds[1:]]
+        result = []
+        for row in driver.select(driver_range):
+            for by_row, r in others:
+                if not r.contains(by_row[row]):
+                    break
+            else:
+                result.append(row)
+        result.sort()
+        return result
+
+    def count(self, conditions: Dict[str, RangeSpec]) -> int:
+        return len(self.query(conditions))
+
+
+def build_range_index(path: str, columns: Iterable[str] = NUMERIC_COLUMNS,
+                      encoding: str = 'utf-8') -> RangeIndex:
+    """One pass over the CSV; columns missing from the header are skipped."""
+    nan = float('nan')
+    with open_text(path, encoding=encoding, errors='replace') as f:
+        records = iter_records(f)
+        header = next(records, None) or []
+        wanted = []
+        for name in columns:
+            idx = find_column(header, name)
+            if idx is not None:
+                wanted.append((header[idx].strip(), idx, array('d')))
+        n_rows = 0
+        for r in records:
+            for _, idx, by_row in wanted:
+                val = parse_number(r[idx]) if idx < len(r) else None
+                by_row.append(nan if val is None else val)
+            n_rows += 1
+    return RangeIndex({name: ColumnIndex.build(name, by_row) for name, _, by_row in wanted}, n_rows)
+
+
+def ranges_path(path: str) -> str:
+    return path + RANGES_SUFFIX
+
+
+def _write_array(f, data: array) -> None:
+    if sys.byteorder != 'little':
+        data = array(data.typecode, data)
+        data.byteswap()
+    data.tofile(f)
+
+
+def _read_array(f, typecode: str, n: int) -> array:
+    data = array(typecode)
+    data.fromfile(f, n)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data
+
+
+def save_range_index(path: str, index: RangeIndex) -> None:
+    st = os.stat(path)
+    tmp = ranges_path(path) + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, st.st_size, st.st_mtime_ns, index.n_rows, len(index.columns)))
+        for name, col in index.columns.items():
+            raw = name.encode('utf-8')
+            f.write(_COLUMN.pack(len(raw), len(col.values)))
+            f.write(raw)
+            _write_array(f, col.values)
+            _write_array(f, col.row_ids)
+            _write_array(f, col.by_row)
+    os.replace(tmp, ranges_path(path))
+
+
+def saved_range_index(path: str) -> Optional[RangeIndex]:
+    """The saved index for path if it is current, else None (never builds one)."""
+    side = ranges_path(path)
+    if not os.path.exists(side):
+        return None
+    st = os.stat(path)
+    try:
+        with open(side, 'rb') as f:
+            magic, size, mtime_ns, n_rows, n_cols = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or size != st.st_size or mtime_ns != st.st_mtime_ns:
+                return None
+            columns = {}
+            for _ in range(n_cols):
+                name_len, n_values = _COLUMN.unpack(f.read(_COLUMN.size))
+                name = f.read(name_len).decode('utf-8')
+                values = _read_array(f, 'd', n_values)
+                row_ids = _read_array(f, 'I', n_values)
+                by_row = _read_array(f, 'd', n_rows)
+                columns[name] = ColumnIndex(name, values, row_ids, by_row)
+    except (struct.error, EOFError, ValueError):
+        # truncated (fromfile: EOFError, or ValueError when cut mid-item) or
+        # corrupt (bad name: UnicodeDecodeError) sidecar -> rebuild
+        return None
+    return RangeIndex(columns, n_rows)
+
+
+def load_range_index(path: str, rebuild: bool = False) -> RangeIndex:
+    """Return the saved index for path, building and saving it if needed."""
+    index = None if rebuild else saved_range_index(path)
+    if index is None:
+        index = build_range_index(path)
+        save_range_index(path, index)
+    return index
+
+
+def select_rows(path: str, conditions: Dict[str, RangeSpec]) -> List[List[str]]:
+    """Rows of path matching conditions, read by offset (only matching rows are parsed)."""
+    index = load_range_index(path)
+    records = RecordIndex(path)
+    if index.n_rows != len(records):
+        # both sidecars are current for this file, so rebuilding would not
+        # change them: the row ids cannot be trusted to name the right rows
+        raise RuntimeError(f'{path}: range index has {index.n_rows} rows but the record '
+                           f'index has {len(records)}')
+    row_ids = index.query(conditions)
+    out = []
+    i = 0
+    # read runs of consecutive row ids with a single seek each
+    while i < len(row_ids):
+        j = i + 1
+        while j < len(row_ids) and row_ids[j] == row_ids[j - 1] + 1:
+            j += 1
+        out.extend(records.rows(row_ids[i], row_ids[j - 1] + 1))
+        i = j
+    return out
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python range_index.py <path-to-csv>')
+        sys.exit(1)
+
+    csv_path = sys.argv[1]
+    idx = load_range_index(csv_path)
+    print(f'{idx.n_rows} rows, indexed columns: {list(idx.columns)}')
+    example = {'Year': (1990, 2000), 'Rating': (8, None), 'Votes': Range(100000, None, include_low=False)}
+    rows = select_rows(csv_path, example)
+    print(f'{len(rows)} rows match {example}')
+    for r in rows[:10]:
+        print(r[1:4])
@@ -0,0 +1,218 @@
+"""
+Sidecar index of record start offsets for random access into the CSV.
+
+Review fields may contain newlines, so "line N" is not "record N" and the
+line-based readers (parse_csv_line in Assignments 7, 8 and 9) split those
+rows in two. This module scans the file once, in binary, counting quotes to
+tell a real record boundary from a newline inside a quoted field, and saves
+the byte offset where every record starts as an array('Q') in <csv>.idx.
+
+With the index:
+ - row(n) seeks straight to data row n (O(1), no parse of earlier rows)
+ - rows(start, stop) pages through e.g. rows 5000-5100 with one read
+ - chunks(k) splits the file into k byte-balanced pieces that start and end
+   on record boundaries, for parallel workers
+
+The index stores the file size and mtime and is rebuilt when they change.
+If the sidecar cannot be written (read-only data directory) the offsets are
+still built and used, just not saved.
+Compressed inputs cannot be indexed (their byte offsets are not seekable).
+Blank lines between records are skipped, as iter_records does.
+"""
+
+import io
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import List, Optional, Tuple
+
+from compressed_input import detect_compression
+from csv_records import iter_records
+
+INDEX_SUFFIX = '.idx'
+_MAGIC = b'IMDBIDX2'  # 2: whitespace-only lines are skipped, as in iter_records
+_HEADER = struct.Struct('<8sQQ')  # magic, file size, mtime_ns
+_SCAN_BLOCK = 4 * 1024 * 1024
+
+
+def _has_text(line: bytes, encoding: str) -> bool:
+    """False for a line iter_records would skip (empty or whitespace only)."""
+    if line.isascii():
+        return bool(line.strip())
+    return bool(line.decode(encoding, errors='replace').strip())
+
+
+def build_offsets(path: str, encoding: str = 'utf-8') -> array:
+    """Scan path once and return the start offset of every record, plus EOF.
+
+    offsets[0] is the header record; offsets[-1] is the file size.
+    """
+    offsets = array('Q')
+    pos = 0          # file offset of the start of the current line
+    record_start = 0
+    quotes = 0       # quotes seen in the current record
+    tail = b''
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(_SCAN_BLOCK)
+            if not block:
+                break
+            lines = (tail + block).split(b'\n')
+            tail = lines.pop()  # incomplete last line, finished by the next block
+            for line in lines:
+                quotes += line.count(b'"')
+                pos += len(line) + 1
+                if quotes % 2:
+                    continue  # newline inside a quoted field
+                if _has_text(line, encoding):
+                    offsets.append(record_start)
+                record_start = pos
+                quotes = 0
+    if _has_text(tail, encoding):
+        offsets.append(record_start)
+    offsets.append(pos + len(tail))
+    return offsets
+
+
+def index_path(path: str) -> str:
+    return path + INDEX_SUFFIX
+
+
+def save_offsets(path: str, offsets: array) -> None:
+    st = os.stat(path)
+    data = array('Q', offsets)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    tmp = index_path(path) + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, st.st_size, st.st_mtime_ns))
+        data.tofile(f)
+    os.replace(tmp, index_path(path))
+
+
+def _read_saved(path: str, st: os.stat_result) -> Optional[array]:
+    """Offsets from the sidecar, or None if it is missing, stale, truncated or corrupt."""
+    side = index_path(path)
+    if not os.path.exists(side):
+        return None
+    with open(side, 'rb') as f:
+        head = f.read(_HEADER.size)
+        body = f.read()
+    if len(head) != _HEADER.size:
+        return None
+    magic, size, mtime_ns = _HEADER.unpack(head)
+    if magic != _MAGIC or size != st.st_size or mtime_ns != st.st_mtime_ns:
+        return None
+    if not body or len(body) % 8:
+        return None  # cut mid-offset
+    offsets = array('Q')
+    offsets.frombytes(body)
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    # header start + EOF at least (an empty file has only EOF), ending at the file size
+    if (len(offsets) < 2 and st.st_size) or offsets[-1] != st.st_size:
+        return None
+    return offsets
+
+
+def load_offsets(path: str, encoding: str = 'utf-8') -> array:
+    """Return the offsets from the sidecar, rebuilding it if missing, stale or corrupt."""
+    if detect_compression(path) is not None:
+        raise ValueError(f'{path}: compressed files cannot be indexed by byte offset')
+    st = os.stat(path)
+    offsets = _read_saved(path, st)
+    if offsets is not None:
+        return offsets
+    offsets = build_offsets(path, encoding)
+    try:
+        save_offsets(path, offsets)
+    except OSError:
+        pass  # e.g. read-only data directory: use the offsets without saving them
+    return offsets
+
+
+class RecordIndex:
+    """Random access to the data rows of a CSV through its offset index.
+
+    Row numbers are 0-based and exclude the header.
+    """
+
+    def __init__(self, path: str, encoding: str = 'utf-8'):
+        self.path = path
+        self.encoding = encoding
+        self.offsets = load_offsets(path, encoding)
+        self.header = self._parse(self._read(0, 1)[0]) if len(self.offsets) > 1 else []
+
+    def __len__(self) -> int:
+        return max(0, len(self.offsets) - 2)
+
+    def _parse(self, raw: bytes) -> List[str]:
+        text = raw.decode(self.encoding, errors='replace')
+        # same newline handling as reading the file in text mode
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        # raw runs up to the next record, so it may end with skipped blank lines
+        return next(iter_records(io.StringIO(text)), [])
+
+    def _read(self, first: int, last: int) -> List[bytes]:
+        """Raw bytes of records first..last-1 (record numbers include the header)."""
+        start = self.offsets[first]
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read(self.offsets[last] - start)
+        return [data[self.offsets[i] - start:self.offsets[i + 1] - start] for i in range(first, last)]
+
+    def row(self, n: int) -> List[str]:
+        """Data row n as a list of fields."""
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError(f'row {n} out of range (0..{len(self) - 1})')
+        return self._parse(self._read(n + 1, n + 2)[0])
+
+    def rows(self, start: int, stop: int) -> List[List[str]]:
+        """Data rows start..stop-1 (clamped to the file), read with a single seek."""
+        start = max(0, start)
+        stop = min(stop, len(self))
+        if start >= stop:
+            return []
+        return [self._parse(raw) for raw in self._read(start + 1, stop + 1)]
+
+    def chunks(self, k: int) -> List[Tuple[int, int]]:
+        """Split the data rows into at most k (start, stop) row ranges of similar byte size."""
+        n = len(self)
+        if n == 0 or k <= 0:
+            return []
+        first_byte = self.offsets[1]
+        total = self.offsets[-1] - first_byte
+        ranges = []
+        start = 0
+        for i in range(1, k):
+            target = first_byte + total * i // k
+            # first data row starting at or after the byte target
+            lo = bisect_left(self.offsets, target, start + 1, n + 1) - 1
+            if lo > start:
+                ranges.append((start, lo))
+                start = lo
+        if start < n:
+            ranges.append((start, n))
+        return ranges
+
+    def byte_range(self, start: int, stop: int) -> Tuple[int, int]:
+        """File byte range [begin, end) covering data rows start..stop-1."""
+        return self.offsets[start + 1], self.offsets[stop + 1]
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python record_index.py <path-to-csv> [first-row] [last-row]')
+        sys.exit(1)
+
+    idx = RecordIndex(sys.argv[1])
+    print(f'{len(idx)} rows indexed in {index_path(sys.argv[1])}')
+    first = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    last = int(sys.argv[3]) if len(sys.argv) > 3 else first + 5
+    for number, r in enumerate(idx.rows(first, last), start=first):
+        print(number, r[:3])
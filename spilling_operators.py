@@ -0,0 +1,334 @@
+"""
+Sort, dedup, word-count and group-by that stay within the memory budget.
+
+Each operator keeps its working state in memory while it fits in the
+budget from memory_budget.py and spills to temporary files once it does
+not, so large merged exports no longer end in MemoryError:
+ - external_sort: sorted runs written to disk, then merged (heapq.merge)
+ - remove_duplicates: the seen-set is hash-partitioned to disk
+ - SpillingAggregator: partial group-by results are hash-partitioned to disk
+
+Built on those:
+ - iter_sorted_by_director(path): like read_and_sort_by_director (Assignment 4)
+ - average_rating_by_certificate(path), genre_counts(path)
+ - most_common_words_by_certificate(path, top_n): like Assignment 9
+
+Certificates are grouped as in categorical_columns (CategoryGroups: case and
+surrounding whitespace ignored, shown under their first spelling).
+
+How much each operator spilled is available from memory_budget.spill_report().
+"""
+
+import heapq
+import operator as op
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from categorical_columns import CategoryGroups, tokenize
+from compressed_input import open_text
+from csv_records import find_column, format_record, iter_records
+from hash_join import join_key
+from memory_budget import MemoryTracker, SpillFile, entry_size, record_size
+
+DEFAULT_PARTITIONS = 16
+
+
+def external_sort(items: Iterable[Any], key: Optional[Callable[[Any], Any]] = None,
+                  operator: str = 'sort', size_fn: Callable[[Any], int] = record_size,
+                  budget: Optional[int] = None) -> Iterator[Any]:
+    """Yield items in sorted order (stable), spilling sorted runs when over budget."""
+    tracker = MemoryTracker(operator, budget)
+    buf: List[Any] = []
+    runs: List[SpillFile] = []
+
+    for item in items:
+        buf.append(item)
+        tracker.add(size_fn(item))
+        if tracker.over_budget():
+            buf.sort(key=key)
+            run = SpillFile(prefix=operator + '_run_')
+            for x in buf:
+                run.write(x)
+            tracker.record_spill(run.finish(), items=len(buf))
+            runs.append(run)
+            buf = []
+            tracker.release()
+
+    buf.sort(key=key)
+    if not runs:
+        yield from buf
+        return
+    # earlier runs come first, so heapq.merge keeps the sort stable
+    try:
+        yield from heapq.merge(*[r.iter_and_remove() for r in runs], iter(buf), key=key)
+    finally:
+        for r in runs:
+            r.close()
+
+
+def iter_sorted_by_director(path: str, encoding: str = 'utf-8') -> Iterator[List[str]]:
+    """Yield the header and then the data rows sorted by Director (case-insensitive)."""
+    with open_text(path, encoding=encoding, errors='replace') as f:
+        records = iter_records(f)
+        header = next(records, None)
+        if header is None:
+            return
+        yield header
+        director_idx = find_column(header, 'Director')
+        if director_idx is None:
+            yield from records
+            return
+
+        def key_fn(row: List[str]) -> str:
+            if director_idx < len(row):
+                return row[director_idx].strip().lower()
+            return ''
+
+        yield from external_sort(records, key=key_fn, operator='sort')
+
+
+def remove_duplicates(input_path: str, output_path: str, encoding: str = 'utf-8',
+                      n_partitions: int = DEFAULT_PARTITIONS, budget: Optional[int] = None) -> int:
+    """Remove duplicate movies (Title+Year key, first occurrence wins) like Assignment 8.
+
+    While the seen-set fits in the budget rows are written straight through.
+    After that, rows are tagged with their position and hash-partitioned to
+    disk together with the keys already seen; each partition is deduplicated
+    on its own and the survivors are merged back in input order.
+    Returns the number of data rows written.
+    """
+    tracker = MemoryTracker('dedup', budget)
+    seen = set()
+    partitions: Optional[List[SpillFile]] = None
+    written = 0
+
+    with open_text(input_path, encoding=encoding, errors='replace') as fin, \
+            open(output_path, 'w', encoding='utf-8', newline='') as fout:
+        records = iter_records(fin)
+        header = next(records, None)
+        if header is None:
+            return 0
+        fout.write(format_record(header))
+        idx_title = find_column(header, 'Title')
+        idx_year = find_column(header, 'Year')
+        if idx_title is None:
+            idx_title = 1  # fallback: second column
+        if idx_year is None:
+            idx_year = 2  # fallback: third column
+
+        for seq, row in enumerate(records):
+            key = join_key(row, idx_title, idx_year)
+            if partitions is not None:
+                p = hash(key) % n_partitions if key is not None else 0
+                partitions[p].write((key, seq, row))
+                continue
+            if key is None:
+                # rows too short to have a key are kept, as in Assignment 8
+                fout.write(format_record(row))
+                written += 1
+                continue
+            if key in seen:
+                continue
+            seen.add(key)
+            tracker.add(entry_size(key))
+            fout.write(format_record(row))
+            written += 1
+            if tracker.over_budget():
+                partitions = [SpillFile(prefix='dedup_part_') for _ in range(n_partitions)]
+                # keys already emitted go first, marked with position -1
+                for k in seen:
+                    partitions[hash(k) % n_partitions].write((k, -1, None))
+                seen = set()
+                tracker.release()
+
+        if partitions is None:
+            return written
+
+        spilled = sum(p.finish() for p in partitions)
+        tracker.record_spill(spilled, files=len(partitions), items=sum(p.items for p in partitions))
+        survivors = []
+        for part in partitions:
+            part_seen = set()
+            out = SpillFile(prefix='dedup_keep_')
+            for key, seq, row in part.iter_and_remove():
+                if key is not None:
+                    if key in part_seen:
+                        continue
+                    part_seen.add(key)
+                if seq >= 0:
+                    out.write((seq, row))
+            survivors.append(out)
+        for _, row in heapq.merge(*[s.iter_and_remove() for s in survivors]):
+            fout.write(format_record(row))
+            written += 1
+    return written
+
+
+class SpillingAggregator:
+    """Hash group-by: key -> accumulated value, combined with combine(acc, value).
+
+    When the table grows past the budget it is written to hash partitions on
+    disk and cleared; items() merges every partition back one at a time.
+    """
+
+    def __init__(self, operator: str, combine: Callable[[Any, Any], Any],
+                 n_partitions: int = DEFAULT_PARTITIONS, budget: Optional[int] = None):
+        self.operator = operator
+        self.combine = combine
+        self.n_partitions = n_partitions
+        self.tracker = MemoryTracker(operator, budget)
+        self.table: Dict[Hashable, Any] = {}
+        self.partitions: Optional[List[SpillFile]] = None
+
+    def add(self, key: Hashable, value: Any) -> None:
+        acc = self.table.get(key)
+        if acc is None:
+            self.table[key] = value
+            self.tracker.add(entry_size(key, value))
+            if self.tracker.over_budget():
+                self.spill()
+        else:
+            self.table[key] = self.combine(acc, value)
+
+    def spill(self) -> None:
+        if not self.table:
+            return
+        files = 0
+        if self.partitions is None:
+            self.partitions = [SpillFile(prefix=self.operator + '_part_') for _ in range(self.n_partitions)]
+            files = self.n_partitions
+        before = sum(p.size() for p in self.partitions)
+        for key, acc in self.table.items():
+            self.partitions[hash(key) % self.n_partitions].write((key, acc))
+        written = sum(p.size() for p in self.partitions) - before
+        self.tracker.record_spill(written, files=files, items=len(self.table))
+        self.table = {}
+        self.tracker.release()
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """Yield the final (key, value) pairs; each key appears exactly once."""
+        if self.partitions is None:
+            yield from self.table.items()
+            return
+        self.spill()
+        for part in self.partitions:
+            merged: Dict[Hashable, Any] = {}
+            for key, acc in part.iter_and_remove():
+                prev = merged.get(key)
+                merged[key] = acc if prev is None else self.combine(prev, acc)
+            yield from merged.items()
+        self.partitions = None
+
+
+def _iter_data(path: str, encoding: str, *names: str):
+    """Yield (header indices, records iterator) for the named columns."""
+    with open_text(path, encoding=encoding, errors='replace') as f:
+        records = iter_records(f)
+        header = next(records, None)
+        if header is None:
+            return
+        idx = [find_column(header, n) for n in names]
+        if any(i is None for i in idx):
+            raise RuntimeError(f'Could not locate columns {names} in header: {header}')
+        width = max(idx)
+        for r in records:
+            if width < len(r):
+                yield [r[i] for i in idx]
+
+
+def _add_pair(a: Tuple[float, int], b: Tuple[float, int]) -> Tuple[float, int]:
+    return (a[0] + b[0], a[1] + b[1])
+
+
+def _add_count_keep_first(a: Tuple[int, int], b: Tuple[int, int]) -> Tuple[int, int]:
+    """Combine (count, first position) pairs."""
+    return (a[0] + b[0], min(a[1], b[1]))
+
+
+def average_rating_by_certificate(path: str, encoding: str = 'utf-8',
+                                  budget: Optional[int] = None) -> Dict[str, float]:
+    """certificate -> average Rating (certificates compared case-insensitively)."""
+    agg = SpillingAggregator('group_by', _add_pair, budget=budget)
+    groups = CategoryGroups()
+    for row, (cert, rating) in enumerate(_iter_data(path, encoding, 'Certificate', 'Rating')):
+        cert = cert.strip()
+        if not cert:
+            continue
+        key = groups.add(cert, row)
+        rating = rating.strip()
+        if not rating:
+            continue
+        try:
+            value = float(rating)
+        except ValueError:
+            continue
+        agg.add(key, (value, 1))
+    totals = dict(agg.items())
+    return {groups.name(k): totals[k][0] / totals[k][1] for k in groups.keys()
+            if k in totals and totals[k][1]}
+
+
+def genre_counts(path: str, encoding: str = 'utf-8', budget: Optional[int] = None) -> Dict[str, int]:
+    """genre -> number of movies (a multi-genre movie counts once per genre)."""
+    agg = SpillingAggregator('group_by', op.add, budget=budget)
+    for (genre_field,) in _iter_data(path, encoding, 'Genre'):
+        for g in genre_field.split(','):
+            g = g.strip()
+            if g:
+                agg.add(g, 1)
+    return dict(agg.items())
+
+
+def most_common_words_by_certificate(path: str, top_n: int = 10, min_word_len: int = 2,
+                                     encoding: str = 'utf-8',
+                                     budget: Optional[int] = None) -> Dict[str, List[Tuple[str, int]]]:
+    """certificate -> list of (word, count) sorted by count desc, like Assignment 9.
+
+    Words with equal counts keep the order they were first seen in, as
+    Assignment 9's stable sort does. The (certificate, word) counts may
+    spill; only the top_n per certificate are ever held in memory when the
+    final counts are merged.
+    """
+    agg = SpillingAggregator('word_count', _add_count_keep_first, budget=budget)
+    groups = CategoryGroups()
+    pos = 0  # running word number, for first-seen order
+    for row, (cert, review) in enumerate(_iter_data(path, encoding, 'Certificate', 'Review')):
+        cert = cert.strip()
+        if not cert:
+            continue
+        key = groups.add(cert, row)
+        for w in tokenize(review, min_word_len):
+            agg.add((key, w), (1, pos))
+            pos += 1
+
+    # heap entries (count, -first position, word): the smallest is the
+    # lowest count, and among equal counts the word seen last
+    heaps: Dict[str, List[Tuple[int, int, str]]] = {}
+    for (key, word), (count, first) in agg.items():
+        heap = heaps.setdefault(key, [])
+        entry = (count, -first, word)
+        if len(heap) < top_n:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    return {groups.name(key): [(w, c) for c, _, w in sorted(heaps[key], reverse=True)]
+            for key in groups.keys() if key in heaps}
+
+
+if __name__ == '__main__':
+    import sys
+
+    from memory_budget import get_memory_budget, set_memory_budget, spill_report
+
+    if len(sys.argv) < 2:
+        print('Usage: python spilling_operators.py <path-to-csv> [memory-budget-bytes]')
+        sys.exit(1)
+
+    if len(sys.argv) > 2:
+        set_memory_budget(int(sys.argv[2]))
+    path = sys.argv[1]
+    print('Memory budget:', get_memory_budget(), 'bytes')
+    print('Average rating by certificate:', average_rating_by_certificate(path))
+    print('Genre counts:', genre_counts(path))
+    for cert, words in most_common_words_by_certificate(path, top_n=5).items():
+        print(cert, ':', words)
+    print('Spilled:', spill_report())